@@ -921,7 +921,7 @@ class PDFToTypstMCPServer:
                     "font": {
                         "name": block.font.name,
                         "size": block.font.size,
-                        "styles": [style.value for style in block.font.styles]
+                        "styles": block.font.style_names
                     },
                     "element_type": block.element_type.value
                 })
@@ -2,7 +2,8 @@
 PDF转Typst工具安装配置
 """
 
-from setuptools import setup, find_packages
+import os
+from setuptools import setup, find_packages, Extension
 from pathlib import Path
 
 # 读取README文件
@@ -19,6 +20,21 @@ if requirements_path.exists():
         if line.strip() and not line.startswith('#')
     ]
 
+# 可选编译：设置环境变量 PDF2TYPST_COMPILE=1 且已安装Cython时，
+# 将字符串处理密集的文档生成模块编译为C扩展；否则保持纯Python安装
+ext_modules = []
+if os.environ.get("PDF2TYPST_COMPILE") == "1":
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        print("未安装Cython，跳过编译，使用纯Python模块")
+    else:
+        ext_modules = cythonize(
+            [Extension("core.typst_generator", ["src/core/typst_generator.py"])],
+            # 不按类型注解生成C类型，保持与纯Python模块完全相同的行为
+            compiler_directives={"language_level": 3, "annotation_typing": False},
+        )
+
 setup(
     name="pdf2typst",
     version="0.1.0",
@@ -31,6 +47,7 @@ setup(
     
     packages=find_packages(where="src"),
     package_dir={"": "src"},
+    ext_modules=ext_modules,
     
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -63,6 +80,12 @@ setup(
             "Flask>=2.3.0",
             "Werkzeug>=2.3.0",
         ],
+        "jit": [
+            "numba>=0.57.0",
+        ],
+        "compile": [
+            "Cython>=3.0.0",
+        ],
     },
     
     entry_points={
@@ -8,17 +8,65 @@ from __future__ import annotations
 
 import re
 from typing import List, Dict, Optional, Tuple
-from collections import defaultdict
 import logging
 
+import numpy as np
+
 from .models import (
     ParsedDocument, TextBlock, Heading, Paragraph, List as DocList,
     ListItem, BoundingBox, ElementType, FontInfo, TextStyle
 )
 
+# 可选导入：Numba可用时对数值内核进行JIT编译
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
 
+def _detect_paragraph_breaks_loop(pages: np.ndarray, y0: np.ndarray, y1: np.ndarray,
+                                  x0: np.ndarray, ls_thr: float,
+                                  indent_thr: float) -> np.ndarray:
+    """逐块检测段落结束位置（Numba内核）"""
+    n = pages.shape[0]
+    breaks = np.zeros(n, dtype=np.bool_)
+    for i in range(n - 1):
+        breaks[i] = (pages[i] != pages[i + 1] or
+                     y0[i + 1] - y1[i] > ls_thr or
+                     abs(x0[i] - x0[i + 1]) > indent_thr)
+    if n > 0:
+        breaks[n - 1] = True
+    return breaks
+
+
+def _detect_paragraph_breaks_numpy(pages: np.ndarray, y0: np.ndarray, y1: np.ndarray,
+                                   x0: np.ndarray, ls_thr: float,
+                                   indent_thr: float) -> np.ndarray:
+    """向量化检测段落结束位置（无Numba时的回退实现）"""
+    breaks = np.ones(pages.shape[0], dtype=bool)
+    breaks[:-1] = ((pages[:-1] != pages[1:]) |
+                   (y0[1:] - y1[:-1] > ls_thr) |
+                   (np.abs(x0[:-1] - x0[1:]) > indent_thr))
+    return breaks
+
+
+if _HAS_NUMBA:
+    _detect_paragraph_breaks = njit(cache=True, boundscheck=False)(_detect_paragraph_breaks_loop)
+else:
+    _detect_paragraph_breaks = _detect_paragraph_breaks_numpy
+
+
+def _may_start_pattern(text: str, start_chars: Optional[frozenset]) -> bool:
+    """首字符预检：模式中的\\d可匹配任意Unicode数字（如全角"１"），数字首字符一律放行"""
+    if start_chars is None:
+        return True
+    first = text[:1]
+    return first in start_chars or first.isdigit()
+
+
 class ContentAnalyzer:
     """内容分析器"""
     
@@ -49,6 +97,8 @@ class ContentAnalyzer:
                 r'^Chapter\s+\d+',  # 英文章节
                 r'^Section\s+\d+',  # 英文小节
             ],
+            # 标题模式可能的首字符，用于跳过不可能匹配的文本
+            'heading_start_chars': '第一二三四五六七八九十0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ',
             
             # 段落识别配置
             'paragraph_line_spacing_threshold': 5.0,  # 行间距阈值
@@ -62,6 +112,9 @@ class ContentAnalyzer:
                 r'^\s*[一二三四五六七八九十]+[.、)]\s*',  # 中文数字列表
                 r'^\s*[(（]\d+[)）]\s*',  # 括号数字
             ],
+            # 列表标记可能的首字符，用于跳过不可能匹配的文本
+            'list_start_chars': ('•·▪▫◦‣⁃0123456789一二三四五六七八九十(（'
+                                 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'),
             
             # 引用识别配置
             'reference_patterns': [
@@ -79,6 +132,12 @@ class ContentAnalyzer:
             ]
         }
         
+        # 自定义标题模式时无法预知其首字符，关闭首字符预检
+        if 'heading_patterns' in self.config and 'heading_start_chars' not in self.config:
+            self.config['heading_start_chars'] = None
+        if 'list_patterns' in self.config and 'list_start_chars' not in self.config:
+            self.config['list_start_chars'] = None
+        
         for key, value in default_config.items():
             if key not in self.config:
                 self.config[key] = value
@@ -88,10 +147,17 @@ class ContentAnalyzer:
         self.heading_regexes = [
             re.compile(pattern) for pattern in self.config['heading_patterns']
         ]
+        self.heading_combined = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.config['heading_patterns'])
+        )
+        start_chars = self.config['heading_start_chars']
+        self._heading_start_chars = frozenset(start_chars) if start_chars else None
         
         self.list_regexes = [
             re.compile(pattern) for pattern in self.config['list_patterns']
         ]
+        start_chars = self.config['list_start_chars']
+        self._list_start_chars = frozenset(start_chars) if start_chars else None
         
         self.reference_regexes = [
             re.compile(pattern) for pattern in self.config['reference_patterns']
@@ -113,6 +179,13 @@ class ContentAnalyzer:
         """
         logger.info("开始分析文档内容")
         
+        # 空文档无需运行各分析步骤
+        if not parsed_doc.text_blocks:
+            parsed_doc.headings = []
+            parsed_doc.paragraphs = []
+            parsed_doc.lists = []
+            return parsed_doc
+        
         # 分析标题
         headings = self.analyze_headings(parsed_doc.text_blocks)
         logger.info(f"识别出 {len(headings)} 个标题")
@@ -199,39 +272,27 @@ class ContentAnalyzer:
             key=lambda b: (b.page, b.bbox.y0, b.bbox.x0)
         )
         
-        # 分组为段落
-        current_paragraph_blocks = []
+        if not sorted_blocks:
+            return paragraphs
         
-        for i, block in enumerate(sorted_blocks):
-            current_paragraph_blocks.append(block)
-            
-            # 检查是否应该结束当前段落
-            should_end_paragraph = False
-            
-            if i < len(sorted_blocks) - 1:
-                next_block = sorted_blocks[i + 1]
-                
-                # 不同页面
-                if block.page != next_block.page:
-                    should_end_paragraph = True
-                
-                # 垂直间距过大
-                elif (next_block.bbox.y0 - block.bbox.y1 > 
-                      self.config['paragraph_line_spacing_threshold']):
-                    should_end_paragraph = True
-                
-                # 缩进变化
-                elif abs(block.bbox.x0 - next_block.bbox.x0) > self.config['paragraph_indent_threshold']:
-                    should_end_paragraph = True
-            else:
-                # 最后一个块
-                should_end_paragraph = True
-            
-            if should_end_paragraph and current_paragraph_blocks:
-                # 创建段落
-                paragraph = self._create_paragraph(current_paragraph_blocks)
-                paragraphs.append(paragraph)
-                current_paragraph_blocks = []
+        # 提取列式坐标，批量检测段落边界
+        n = len(sorted_blocks)
+        pages = np.fromiter((b.page for b in sorted_blocks), dtype=np.int64, count=n)
+        y0 = np.fromiter((b.bbox.y0 for b in sorted_blocks), dtype=np.float64, count=n)
+        y1 = np.fromiter((b.bbox.y1 for b in sorted_blocks), dtype=np.float64, count=n)
+        x0 = np.fromiter((b.bbox.x0 for b in sorted_blocks), dtype=np.float64, count=n)
+        
+        breaks = _detect_paragraph_breaks(
+            pages, y0, y1, x0,
+            float(self.config['paragraph_line_spacing_threshold']),
+            float(self.config['paragraph_indent_threshold'])
+        )
+        
+        # 分组为段落
+        start = 0
+        for end in (np.flatnonzero(breaks) + 1).tolist():
+            paragraphs.append(self._create_paragraph(sorted_blocks[start:end]))
+            start = end
         
         return paragraphs
     
@@ -246,36 +307,39 @@ class ContentAnalyzer:
             List[DocList]: 列表
         """
         lists = []
-        current_list_items = []
         
-        for block in text_blocks:
-            list_match = self._match_list_pattern(block.text)
-            
-            if list_match:
+        # 没有任何文本块以列表标记开头时直接返回
+        start_chars = self._list_start_chars
+        if start_chars is not None and not any(
+            _may_start_pattern(block.text.lstrip(), start_chars) for block in text_blocks
+        ):
+            return lists
+        
+        # 第一遍：逐块匹配列表模式
+        matches = [self._match_list_pattern(block.text) for block in text_blocks]
+        is_match = np.fromiter(
+            (match is not None for match in matches), dtype=np.int8, count=len(matches)
+        )
+        
+        # 第二遍：两端补0后差分，+1处为连续匹配段的起点，-1处为终点
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], is_match, [0]))))
+        
+        for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            items = []
+            for block, list_match in zip(text_blocks[start:end], matches[start:end]):
                 # 创建列表项
-                item = ListItem(
+                items.append(ListItem(
                     text=block.text,
                     level=self._determine_list_level(block),
                     bullet_type=list_match['type'],
                     page=block.page,
                     bbox=block.bbox
-                )
-                
-                current_list_items.append(item)
+                ))
                 
                 # 更新文本块类型
                 block.element_type = ElementType.LIST
-                
-            elif current_list_items:
-                # 结束当前列表
-                doc_list = self._create_list(current_list_items)
-                lists.append(doc_list)
-                current_list_items = []
-        
-        # 处理最后的列表
-        if current_list_items:
-            doc_list = self._create_list(current_list_items)
-            lists.append(doc_list)
+            
+            lists.append(self._create_list(items))
         
         return lists
     
@@ -297,13 +361,14 @@ class ContentAnalyzer:
         if block.is_bold:
             return True
         
-        # 模式匹配检查
-        for regex in self.heading_regexes:
-            if regex.match(block.text.strip()):
-                return True
+        # 模式匹配检查（首字符不可能命中时跳过正则）
+        stripped = block.text.strip()
+        if (_may_start_pattern(stripped, self._heading_start_chars) and
+                self.heading_combined.match(stripped)):
+            return True
         
         # 短文本且居中
-        if len(block.text.strip()) < 50 and self._is_centered(block):
+        if len(stripped) < 50 and self._is_centered(block):
             return True
         
         return False
@@ -341,17 +406,19 @@ class ContentAnalyzer:
         if not headings:
             return headings
         
-        # 统计各级别的字体大小
-        level_sizes = defaultdict(list)
-        for heading in headings:
-            level_sizes[heading.font.size].append(heading)
+        # 只有一个标题时必为一级
+        if len(headings) == 1:
+            headings[0].level = 1
+            return headings
         
-        # 按字体大小排序，重新分配级别
-        sorted_sizes = sorted(level_sizes.keys(), reverse=True)
+        # 按字体大小去重排序，字体越大级别越高（np.unique为升序）
+        sizes = np.fromiter((h.font.size for h in headings), dtype=np.float64,
+                            count=len(headings))
+        unique_sizes, inverse = np.unique(sizes, return_inverse=True)
+        levels = np.minimum(len(unique_sizes) - inverse, 6)  # 最多6级标题
         
-        for level, size in enumerate(sorted_sizes, 1):
-            for heading in level_sizes[size]:
-                heading.level = min(level, 6)  # 最多6级标题
+        for heading, level in zip(headings, levels.tolist()):
+            heading.level = level
         
         return headings
     
@@ -403,8 +470,12 @@ class ContentAnalyzer:
     
     def _match_list_pattern(self, text: str) -> Optional[Dict]:
         """匹配列表模式"""
+        stripped = text.strip()
+        if not _may_start_pattern(stripped, self._list_start_chars):
+            return None
+        
         for regex in self.list_regexes:
-            match = regex.match(text.strip())
+            match = regex.match(stripped)
             if match:
                 # 确定列表类型
                 matched_text = match.group(0)
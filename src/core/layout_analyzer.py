@@ -12,16 +12,77 @@ from __future__ import annotations
 
 import math
 from typing import List, Dict, Tuple, Optional, Set
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
 
+import numpy as np
+
 from .models import (
     ParsedDocument, TextBlock, Image, Table, Heading, Paragraph,
     BoundingBox, ElementType
 )
 
+# 可选导入：Numba可用时对数值内核进行JIT编译
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
+# 页面元素的收集顺序：(元素类型, ParsedDocument中的类别名)
+_ELEMENT_CATEGORIES = (
+    ('heading', 'headings'),
+    ('paragraph', 'paragraphs'),
+    ('table', 'tables'),
+    ('image', 'images'),
+    ('list', 'lists'),
+)
+
+
+def _bbox_matrix(elements: List[Tuple[str, object]]) -> np.ndarray:
+    """将带边界框的元素转换为(N, 4)数组，列依次为x0, y0, x1, y1"""
+    return np.fromiter(
+        (v for _, e in elements if getattr(e, 'bbox', None)
+         for v in (e.bbox.x0, e.bbox.y0, e.bbox.x1, e.bbox.y1)),
+        dtype=np.float64
+    ).reshape(-1, 4)
+
+
+def _text_wrap_mask_loop(txt: np.ndarray, img: np.ndarray, threshold: float) -> np.ndarray:
+    """批量判断文本是否环绕图像，返回(T, I)布尔矩阵（Numba内核）"""
+    n_txt, n_img = txt.shape[0], img.shape[0]
+    out = np.zeros((n_txt, n_img), dtype=np.bool_)
+    for t in range(n_txt):
+        for i in range(n_img):
+            horizontal_adjacent = (abs(txt[t, 2] - img[i, 0]) < threshold or
+                                   abs(img[i, 2] - txt[t, 0]) < threshold)
+            vertical_overlap = not (txt[t, 3] < img[i, 1] - threshold or
+                                    txt[t, 1] > img[i, 3] + threshold)
+            out[t, i] = horizontal_adjacent and vertical_overlap
+    return out
+
+
+def _text_wrap_mask_numpy(txt: np.ndarray, img: np.ndarray, threshold: float) -> np.ndarray:
+    """批量判断文本是否环绕图像，返回(T, I)布尔矩阵（无Numba时的回退实现）"""
+    t_x0, t_y0, t_x1, t_y1 = (txt[:, k, None] for k in range(4))
+    i_x0, i_y0, i_x1, i_y1 = (img[None, :, k] for k in range(4))
+    
+    # 文本在图像的左侧或右侧
+    horizontal_adjacent = ((np.abs(t_x1 - i_x0) < threshold) |
+                           (np.abs(i_x1 - t_x0) < threshold))
+    # 垂直位置有重叠
+    vertical_overlap = ~((t_y1 < i_y0 - threshold) | (t_y0 > i_y1 + threshold))
+    
+    return horizontal_adjacent & vertical_overlap
+
+
+if _HAS_NUMBA:
+    _text_wrap_mask = njit(cache=True, fastmath=True)(_text_wrap_mask_loop)
+else:
+    _text_wrap_mask = _text_wrap_mask_numpy
+
 
 @dataclass
 class LayoutRegion:
@@ -43,6 +104,10 @@ class PageLayout:
     has_header: bool = False
     has_footer: bool = False
     margins: Dict[str, float] = None
+    # 元素精确位置缓存：id(element) -> (element, bbox, 位置信息)
+    _position_cache: Dict[int, Tuple[object, BoundingBox, Dict[str, float]]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
 
 class LayoutAnalyzer:
@@ -84,6 +149,10 @@ class LayoutAnalyzer:
         for key, value in default_config.items():
             if key not in self.config:
                 self.config[key] = value
+        
+        # 舍入精度在热点路径中频繁使用，预先取出
+        self._pos_prec = self.config['position_precision']
+        self._size_prec = self.config['size_precision']
     
     def analyze_page_layout(self, parsed_doc: ParsedDocument, page_num: int) -> PageLayout:
         """
@@ -98,21 +167,31 @@ class LayoutAnalyzer:
         """
         logger.info(f"分析第{page_num}页的布局")
         
-        # 获取页面元素
-        page_elements = parsed_doc.get_elements_by_page(page_num)
-        
-        # 获取真实页面尺寸
-        page_width, page_height = self._get_real_page_size(parsed_doc, page_num)
+        # 获取页面元素（只查询一次，后续步骤共用）
+        page_elements = parsed_doc.get_elements_by_page(page_num, copy=False)
         
         # 合并所有元素
         all_elements = self._collect_all_elements(page_elements)
         
+        # 页面元素边界框矩阵（与all_elements顺序一致，缺少边界框的行为NaN）
+        page_bboxes = parsed_doc.get_page_bboxes(page_num)
+        aligned_bboxes = np.concatenate([page_bboxes[key] for _, key in _ELEMENT_CATEGORIES])
+        
+        # 获取真实页面尺寸
+        page_width, page_height = self._get_real_page_size(
+            parsed_doc, page_num, all_elements, aligned_bboxes
+        )
+        
         # 使用绝对定位布局而不是强制多列布局
-        regions = self._create_absolute_layout(all_elements, page_width, page_height)
+        regions = self._create_absolute_layout(all_elements, page_width, page_height,
+                                               aligned_bboxes)
         
         # 分析元素关系
         self._analyze_element_relationships(regions)
         
+        # 去掉缺少边界框的行，用于边距计算
+        bboxes = aligned_bboxes[~np.isnan(aligned_bboxes).any(axis=1)]
+        
         layout = PageLayout(
             page_num=page_num,
             page_width=page_width,
@@ -121,53 +200,74 @@ class LayoutAnalyzer:
             column_count=1,  # 使用绝对定位，不分列
             has_header=any(r.region_type == 'header' for r in regions),
             has_footer=any(r.region_type == 'footer' for r in regions),
-            margins=self._calculate_margins(all_elements, page_width, page_height)
+            margins=self._calculate_margins(all_elements, page_width, page_height, bboxes)
         )
         
         logger.info(f"页面布局分析完成：使用绝对定位布局")
         return layout
     
     def _collect_all_elements(self, page_elements: Dict) -> List[Tuple[str, object]]:
-        """收集页面中的所有元素"""
-        all_elements = []
-        
-        # 添加各类元素
-        for heading in page_elements.get('headings', []):
-            all_elements.append(('heading', heading))
-        
-        for paragraph in page_elements.get('paragraphs', []):
-            all_elements.append(('paragraph', paragraph))
-        
-        for table in page_elements.get('tables', []):
-            all_elements.append(('table', table))
-        
-        for image in page_elements.get('images', []):
-            all_elements.append(('image', image))
-        
-        for doc_list in page_elements.get('lists', []):
-            all_elements.append(('list', doc_list))
-        
-        return all_elements
+        """收集页面中的所有元素（顺序与_ELEMENT_CATEGORIES一致）"""
+        return [
+            (element_type, element)
+            for element_type, key in _ELEMENT_CATEGORIES
+            for element in page_elements.get(key, ())
+        ]
     
-    def _get_real_page_size(self, parsed_doc: ParsedDocument, page_num: int) -> Tuple[float, float]:
-        """获取真实的页面尺寸"""
+    def _get_real_page_size(self, parsed_doc: ParsedDocument, page_num: int,
+                            all_elements: Optional[List[Tuple[str, object]]] = None,
+                            bboxes: Optional[np.ndarray] = None) -> Tuple[float, float]:
+        """
+        获取真实的页面尺寸
+        
+        Args:
+            parsed_doc: 解析后的文档
+            page_num: 页面号
+            all_elements: 已收集的页面元素，估算尺寸时使用
+            bboxes: 与all_elements对应的边界框数组，估算尺寸时使用
+        """
         # 尝试从文档元数据中获取页面信息
-        if hasattr(parsed_doc, 'pages') and parsed_doc.pages:
-            for page_info in parsed_doc.pages:
-                if page_info.number == page_num:
-                    return page_info.width, page_info.height
+        page_info = parsed_doc.get_page(page_num)
+        if page_info is not None:
+            return page_info.width, page_info.height
         
         # 如果没有页面信息，回退到估算方法
-        return self._estimate_page_size_from_elements(parsed_doc.get_elements_by_page(page_num))
+        if all_elements is None:
+            all_elements = self._collect_all_elements(
+                parsed_doc.get_elements_by_page(page_num, copy=False)
+            )
+        return self._estimate_page_size_from_elements(all_elements, bboxes)
     
     def _create_absolute_layout(self, elements: List[Tuple[str, object]], 
-                               page_width: float, page_height: float) -> List[LayoutRegion]:
-        """创建绝对定位布局"""
+                               page_width: float, page_height: float,
+                               bboxes: Optional[np.ndarray] = None) -> List[LayoutRegion]:
+        """
+        创建绝对定位布局
+        
+        Args:
+            elements: 页面元素列表
+            page_width: 页面宽度
+            page_height: 页面高度
+            bboxes: 与elements逐行对应的(N, 4)边界框数组，缺少边界框的行为NaN
+        """
         if not elements:
             return []
         
+        if bboxes is None:
+            nan = float('nan')
+            bboxes = np.array(
+                [(e.bbox.x0, e.bbox.y0, e.bbox.x1, e.bbox.y1)
+                 if getattr(e, 'bbox', None) else (nan, nan, nan, nan)
+                 for _, e in elements],
+                dtype=np.float64
+            ).reshape(-1, 4)
+        
         # 创建单个主要区域，包含所有元素，按位置排序
-        sorted_elements = sorted(elements, key=lambda x: self._get_element_sort_key(x[1]))
+        # 排序键与_get_element_sort_key一致：(-y0, x0)，缺少边界框的元素为(0, 0)
+        ys = np.nan_to_num(-bboxes[:, 1], nan=0.0)
+        xs = np.nan_to_num(bboxes[:, 0], nan=0.0)
+        order = np.lexsort((xs, ys))
+        sorted_elements = [elements[i] for i in order.tolist()]
         
         main_region = LayoutRegion(
             bbox=BoundingBox(0, 0, page_width, page_height),
@@ -178,21 +278,26 @@ class LayoutAnalyzer:
         
         return [main_region]
     
-    def _estimate_page_size_from_elements(self, page_elements: Dict) -> Tuple[float, float]:
-        """从元素估算页面尺寸"""
-        all_elements = self._collect_all_elements(page_elements)
+    def _estimate_page_size_from_elements(self, all_elements: List[Tuple[str, object]],
+                                          bboxes: Optional[np.ndarray] = None) -> Tuple[float, float]:
+        """
+        从元素估算页面尺寸
         
-        if not all_elements:
-            return 595.0, 842.0  # A4默认尺寸（点）
+        Args:
+            all_elements: 已收集的页面元素
+            bboxes: 可选的(N, 4)边界框数组，缺少边界框的行可为NaN
+        """
+        if bboxes is None:
+            bboxes = _bbox_matrix(all_elements)
+        else:
+            bboxes = bboxes[~np.isnan(bboxes).any(axis=1)]
         
-        # 从所有元素的边界框推断页面尺寸
-        max_x = 0
-        max_y = 0
+        if not len(bboxes):
+            return 595.0, 842.0  # A4默认尺寸（点）
         
-        for element_type, element in all_elements:
-            if hasattr(element, 'bbox') and element.bbox:
-                max_x = max(max_x, element.bbox.x1)
-                max_y = max(max_y, element.bbox.y1)
+        # 页面尺寸只取决于右边界和上边界的最大值，各做一次归约
+        max_x = max(0, float(bboxes[:, 2].max()))
+        max_y = max(0, float(bboxes[:, 3].max()))
         
         # 添加一些边距
         page_width = max_x + 50 if max_x > 0 else 595.0
@@ -216,7 +321,6 @@ class LayoutAnalyzer:
             return []
         
         # 聚类x坐标来识别列
-        x_positions.sort()
         column_starts = self._cluster_positions(x_positions)
         
         # 如果只有一列，创建单列布局
@@ -230,10 +334,11 @@ class LayoutAnalyzer:
         
         # 创建多列区域
         regions = []
+        half_gap = self.config['column_gap_threshold'] / 2
         for i, start_x in enumerate(column_starts):
             # 计算列的右边界
             if i < len(column_starts) - 1:
-                end_x = column_starts[i + 1] - self.config['column_gap_threshold'] / 2
+                end_x = column_starts[i + 1] - half_gap
             else:
                 end_x = page_width
             
@@ -259,21 +364,16 @@ class LayoutAnalyzer:
         if not positions:
             return []
         
+        # 排序后每个位置只需与最后一个聚类比较
+        positions = sorted(positions)
         clusters = [positions[0]]
         threshold = self.config['column_alignment_tolerance']
         
         for pos in positions[1:]:
-            # 检查是否与现有聚类接近
-            found_cluster = False
-            for i, cluster_pos in enumerate(clusters):
-                if abs(pos - cluster_pos) <= threshold:
-                    found_cluster = True
-                    break
-            
-            if not found_cluster:
+            if pos - clusters[-1] > threshold:
                 clusters.append(pos)
         
-        return sorted(clusters)
+        return clusters
     
     def _detect_special_regions(self, regions: List[LayoutRegion], 
                                page_height: float) -> List[LayoutRegion]:
@@ -369,23 +469,24 @@ class LayoutAnalyzer:
     def _analyze_text_wrapping(self, region: LayoutRegion):
         """分析文本环绕"""
         # 识别图像周围的文本环绕
-        images = [(i, elem) for i, (elem_type, elem) in enumerate(region.elements) 
-                 if elem_type == 'image']
-        
-        for img_idx, image in images:
-            if not hasattr(image, 'bbox'):
-                continue
-            
-            # 查找可能环绕此图像的文本
-            for i, (text_type, text_elem) in enumerate(region.elements):
-                if (text_type in ['paragraph', 'heading'] and 
-                    hasattr(text_elem, 'bbox') and text_elem.bbox):
-                    
-                    # 检查文本是否在图像周围
-                    if self._is_text_wrapping_image(text_elem.bbox, image.bbox):
-                        # 标记为环绕文本（可以在元素上添加属性）
-                        if hasattr(text_elem, 'wraps_around'):
-                            text_elem.wraps_around = image
+        images = [(t, e) for t, e in region.elements
+                  if t == 'image' and getattr(e, 'bbox', None)]
+        texts = [(t, e) for t, e in region.elements
+                 if t in ('paragraph', 'heading') and getattr(e, 'bbox', None)]
+        
+        if not images or not texts:
+            return
+        
+        mask = _text_wrap_mask(_bbox_matrix(texts), _bbox_matrix(images),
+                               float(self.config['text_wrap_threshold']))
+        
+        # 每个文本取最后一个满足条件的图像
+        last_image = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+        for t_idx in np.flatnonzero(mask.any(axis=1)).tolist():
+            text_elem = texts[t_idx][1]
+            # 标记为环绕文本（可以在元素上添加属性）
+            if hasattr(text_elem, 'wraps_around'):
+                text_elem.wraps_around = images[last_image[t_idx]][1]
     
     def _is_text_wrapping_image(self, text_bbox: BoundingBox, 
                                image_bbox: BoundingBox) -> bool:
@@ -406,7 +507,8 @@ class LayoutAnalyzer:
         return horizontal_adjacent and vertical_overlap
     
     def _calculate_margins(self, elements: List[Tuple[str, object]], 
-                          page_width: float, page_height: float) -> Dict[str, float]:
+                          page_width: float, page_height: float,
+                          bboxes: Optional[np.ndarray] = None) -> Dict[str, float]:
         """计算页面边距"""
         if not elements:
             return {'top': 50, 'bottom': 50, 'left': 50, 'right': 50}
@@ -416,44 +518,64 @@ class LayoutAnalyzer:
         min_y = page_height
         max_y = 0
         
-        for element_type, element in elements:
-            if hasattr(element, 'bbox') and element.bbox:
-                min_x = min(min_x, element.bbox.x0)
-                max_x = max(max_x, element.bbox.x1)
-                min_y = min(min_y, element.bbox.y0)
-                max_y = max(max_y, element.bbox.y1)
+        if bboxes is None:
+            bboxes = _bbox_matrix(elements)
+        
+        if len(bboxes):
+            mins = bboxes.min(axis=0)
+            maxs = bboxes.max(axis=0)
+            min_x = min(min_x, float(mins[0]))
+            max_x = max(max_x, float(maxs[2]))
+            min_y = min(min_y, float(mins[1]))
+            max_y = max(max_y, float(maxs[3]))
         
+        pos_prec = self._pos_prec
         return {
-            'left': round(min_x, self.config['position_precision']),
-            'right': round(page_width - max_x, self.config['position_precision']),
-            'top': round(page_height - max_y, self.config['position_precision']),
-            'bottom': round(min_y, self.config['position_precision'])
+            'left': round(min_x, pos_prec),
+            'right': round(page_width - max_x, pos_prec),
+            'top': round(page_height - max_y, pos_prec),
+            'bottom': round(min_y, pos_prec)
         }
     
     def get_element_precise_position(self, element, page_layout: PageLayout) -> Dict[str, float]:
-        """获取元素的精确位置信息"""
+        """
+        获取元素的精确位置信息
+        
+        结果按元素缓存在page_layout上，元素的bbox被替换时重新计算；
+        返回的字典为缓存对象，调用方不应修改。
+        """
         if not hasattr(element, 'bbox') or not element.bbox:
             return {}
         
         bbox = element.bbox
+        cache = page_layout._position_cache
+        cached = cache.get(id(element))
+        if cached is not None and cached[0] is element and cached[1] is bbox:
+            return cached[2]
+        
+        pos_prec = self._pos_prec
+        size_prec = self._size_prec
+        page_width = page_layout.page_width
+        page_height = page_layout.page_height
+        width = bbox.width
+        height = bbox.height
         
         # 转换为相对位置（相对于页面尺寸的百分比）
-        rel_x = round(bbox.x0 / page_layout.page_width * 100, 
-                     self.config['position_precision'])
-        rel_y = round((page_layout.page_height - bbox.y1) / page_layout.page_height * 100,
-                     self.config['position_precision'])
-        rel_width = round(bbox.width / page_layout.page_width * 100,
-                         self.config['size_precision'])
-        rel_height = round(bbox.height / page_layout.page_height * 100,
-                          self.config['size_precision'])
-        
-        return {
-            'abs_x': round(bbox.x0, self.config['position_precision']),
-            'abs_y': round(bbox.y0, self.config['position_precision']),
-            'abs_width': round(bbox.width, self.config['size_precision']),
-            'abs_height': round(bbox.height, self.config['size_precision']),
+        rel_x = round(bbox.x0 / page_width * 100, pos_prec)
+        rel_y = round((page_height - bbox.y1) / page_height * 100, pos_prec)
+        rel_width = round(width / page_width * 100, size_prec)
+        rel_height = round(height / page_height * 100, size_prec)
+        
+        position = {
+            'abs_x': round(bbox.x0, pos_prec),
+            'abs_y': round(bbox.y0, pos_prec),
+            'abs_width': round(width, size_prec),
+            'abs_height': round(height, size_prec),
             'rel_x': rel_x,
             'rel_y': rel_y,
             'rel_width': rel_width,
             'rel_height': rel_height
         }
+        # 缓存中保留元素引用，避免元素释放后id被复用
+        cache[id(element)] = (element, bbox, position)
+        return position
@@ -6,10 +6,21 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Tuple, Dict, Optional, Any, Union
-from enum import Enum
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Tuple, Dict, Iterator, Optional, Any, Union
+from enum import Enum, IntFlag
 import json
+import sys
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # 列式边界框需要numpy，数据模型本身不依赖
+    np = None
+
+# 高频创建的元素模型使用__slots__（Python 3.10+ 支持dataclass(slots=True)）
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
 
 class ElementType(Enum):
@@ -27,32 +38,63 @@ class ElementType(Enum):
     REFERENCE = "reference"
 
 
-class TextStyle(Enum):
-    """文本样式枚举"""
-    NORMAL = "normal"
-    BOLD = "bold"
-    ITALIC = "italic"
-    UNDERLINE = "underline"
-    STRIKETHROUGH = "strikethrough"
+class TextStyle(IntFlag):
+    """文本样式位标志（可按位组合，NORMAL为0）"""
+    NORMAL = 0
+    BOLD = 1
+    ITALIC = 2
+    UNDERLINE = 4
+    STRIKETHROUGH = 8
 
 
-@dataclass
+# 样式位标志与名称的对应关系（按输出顺序）
+_STYLE_NAMES = (
+    (TextStyle.BOLD, "bold"),
+    (TextStyle.ITALIC, "italic"),
+    (TextStyle.UNDERLINE, "underline"),
+    (TextStyle.STRIKETHROUGH, "strikethrough"),
+)
+
+
+def _to_style_flags(styles) -> TextStyle:
+    """将样式标志或样式列表统一转换为TextStyle位标志"""
+    if isinstance(styles, int):
+        return TextStyle(styles)
+    flags = TextStyle.NORMAL
+    for style in styles or ():
+        flags |= style
+    return flags
+
+
+@dataclass(frozen=True, **_SLOTS)
 class BoundingBox:
-    """边界框"""
+    """
+    边界框（不可变，宽高在创建时计算）
+    
+    按坐标值比较和哈希，可直接放入集合或用作字典键去重；
+    需要修改坐标时使用dataclasses.replace创建新实例。
+    """
     x0: float  # 左边界
     y0: float  # 下边界
     x1: float  # 右边界
     y1: float  # 上边界
+    _width: float = field(init=False, repr=False, compare=False)
+    _height: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """预先计算宽度和高度"""
+        object.__setattr__(self, '_width', self.x1 - self.x0)
+        object.__setattr__(self, '_height', self.y1 - self.y0)
     
     @property
     def width(self) -> float:
         """获取宽度"""
-        return self.x1 - self.x0
+        return self._width
     
     @property
     def height(self) -> float:
         """获取高度"""
-        return self.y1 - self.y0
+        return self._height
     
     @property
     def center(self) -> Tuple[float, float]:
@@ -60,21 +102,61 @@ class BoundingBox:
         return ((self.x0 + self.x1) / 2, (self.y0 + self.y1) / 2)
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class FontInfo:
-    """字体信息"""
+    """
+    字体信息
+    
+    不可变：make_font返回的实例由多个文本块共享，需要不同字体时用
+    make_font或dataclasses.replace创建新实例。
+    """
     name: str
     size: float
-    color: Tuple[int, int, int]  # RGB颜色
-    styles: List[TextStyle]
+    color: int  # 打包的0xRRGGBB颜色
+    styles: TextStyle = TextStyle.NORMAL  # 样式位标志
     
     def __post_init__(self):
-        """后处理，确保样式列表不为空"""
-        if not self.styles:
-            self.styles = [TextStyle.NORMAL]
+        """后处理，兼容样式列表和(R, G, B)元组颜色"""
+        if not isinstance(self.styles, TextStyle):
+            object.__setattr__(self, 'styles', _to_style_flags(self.styles))
+        if not isinstance(self.color, int):
+            r, g, b = self.color
+            object.__setattr__(self, 'color',
+                               (int(r) & 0xFF) << 16 | (int(g) & 0xFF) << 8 | (int(b) & 0xFF))
+    
+    @property
+    def rgb(self) -> Tuple[int, int, int]:
+        """获取(R, G, B)颜色元组"""
+        color = self.color
+        return (color >> 16 & 0xFF, color >> 8 & 0xFF, color & 0xFF)
+    
+    @property
+    def style_names(self) -> List[str]:
+        """获取样式名称列表，始终以"normal"开头"""
+        styles = self.styles
+        return ["normal"] + [name for flag, name in _STYLE_NAMES if styles & flag]
 
 
-@dataclass
+# FontInfo享元缓存大小：字体名带有各文档的子集前缀，长期运行的服务中需要限制缓存大小
+_FONT_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=_FONT_CACHE_SIZE)
+def _cached_font(name: str, size: float, color: int, styles: int) -> FontInfo:
+    """按(名称, 字号, 颜色, 样式)缓存FontInfo实例"""
+    return FontInfo(name, size, color, TextStyle(styles))
+
+
+def make_font(name: str, size: float, color: int, styles: TextStyle = TextStyle.NORMAL) -> FontInfo:
+    """
+    获取共享的FontInfo实例
+    
+    文档中不同的字体组合通常很少，相同组合的文本块共享同一个实例。
+    """
+    return _cached_font(name, size, color, int(_to_style_flags(styles)))
+
+
+@dataclass(**_SLOTS)
 class TextBlock:
     """文本块"""
     text: str
@@ -91,15 +173,15 @@ class TextBlock:
     @property
     def is_bold(self) -> bool:
         """是否为粗体"""
-        return TextStyle.BOLD in self.font.styles
+        return bool(self.font.styles & TextStyle.BOLD)
     
     @property
     def is_italic(self) -> bool:
         """是否为斜体"""
-        return TextStyle.ITALIC in self.font.styles
+        return bool(self.font.styles & TextStyle.ITALIC)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class TableCell:
     """表格单元格"""
     text: str
@@ -114,7 +196,7 @@ class TableCell:
         self.text = self.text.strip()
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Table:
     """表格"""
     cells: List[TableCell]
@@ -125,24 +207,40 @@ class Table:
     has_header: bool = False
     table_type: str = "simple"  # simple, complex, form
     confidence: float = 1.0
+    # (行, 列) -> 单元格 索引，构造时建立
+    _index: Dict[Tuple[int, int], TableCell] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def __post_init__(self):
+        """建立单元格位置索引（同一位置有多个单元格时后者覆盖前者，与逐个写入二维数组一致）"""
+        index = {}
+        for cell in self.cells:
+            index[(cell.row, cell.col)] = cell
+        self._index = index
     
     def get_cell(self, row: int, col: int) -> Optional[TableCell]:
         """获取指定位置的单元格"""
-        for cell in self.cells:
-            if cell.row == row and cell.col == col:
-                return cell
-        return None
+        return self._index.get((row, col))
     
     def to_2d_array(self) -> List[List[str]]:
         """转换为二维数组格式"""
         result = [["" for _ in range(self.cols)] for _ in range(self.rows)]
-        for cell in self.cells:
-            if 0 <= cell.row < self.rows and 0 <= cell.col < self.cols:
-                result[cell.row][cell.col] = cell.text
+        for (row, col), cell in self._index.items():
+            if 0 <= row < self.rows and 0 <= col < self.cols:
+                result[row][col] = cell.text
         return result
+    
+    def iter_cells_rowmajor(self) -> Iterator[Tuple[int, int, str]]:
+        """按行优先顺序遍历所有位置，生成 (行, 列, 文本)，空位置的文本为空字符串"""
+        get = self._index.get
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cell = get((row, col))
+                yield row, col, cell.text if cell is not None else ""
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Image:
     """图像"""
     data: bytes
@@ -160,7 +258,7 @@ class Image:
         return len(self.data) / (1024 * 1024)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Heading:
     """标题"""
     text: str
@@ -175,7 +273,7 @@ class Heading:
         self.level = max(1, min(6, self.level))
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Paragraph:
     """段落"""
     text_blocks: List[TextBlock]
@@ -192,7 +290,7 @@ class Paragraph:
         return " ".join(block.text for block in self.text_blocks)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ListItem:
     """列表项"""
     text: str
@@ -211,7 +309,7 @@ class List:
     list_type: str  # ordered, unordered
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class PageInfo:
     """页面信息"""
     number: int
@@ -245,6 +343,25 @@ class DocumentMetadata:
         }
 
 
+# 保护ParsedDocument页面索引的惰性构建（多线程按页分析时共享文档）
+_PAGE_INDEX_LOCK = threading.RLock()
+
+# 按页面索引的元素类别
+_PAGE_ELEMENT_KEYS = (
+    "text_blocks", "tables", "images", "headings", "paragraphs", "lists",
+)
+
+
+def _bbox_array(elements) -> "np.ndarray":
+    """将元素边界框转换为(N, 4)数组，缺少边界框的元素对应行为NaN"""
+    nan = float('nan')
+    return np.array(
+        [(e.bbox.x0, e.bbox.y0, e.bbox.x1, e.bbox.y1) if e.bbox else (nan, nan, nan, nan)
+         for e in elements],
+        dtype=np.float64
+    ).reshape(-1, 4)
+
+
 @dataclass
 class ParsedDocument:
     """解析后的文档"""
@@ -257,16 +374,103 @@ class ParsedDocument:
     paragraphs: List[Paragraph]
     lists: List[List]
     
-    def get_elements_by_page(self, page_num: int) -> Dict[str, List]:
-        """获取指定页面的所有元素"""
-        return {
-            "text_blocks": [tb for tb in self.text_blocks if tb.page == page_num],
-            "tables": [t for t in self.tables if t.page == page_num],
-            "images": [img for img in self.images if img.page == page_num],
-            "headings": [h for h in self.headings if h.page == page_num],
-            "paragraphs": [p for p in self.paragraphs if p.page == page_num],
-            "lists": [l for l in self.lists if l.page == page_num],
-        }
+    # 按页面分桶的元素索引，首次按页查询时构建
+    _by_page: Optional[Dict[int, Dict[str, list]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # 按页面缓存的列式边界框数组，与_by_page同步失效
+    _bboxes_by_page: Optional[Dict[int, Dict[str, Any]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # 页码 -> 页面信息 索引，首次调用get_page时构建
+    _pages_by_num: Optional[Dict[int, PageInfo]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        """替换元素列表或页面列表时使对应索引失效"""
+        super().__setattr__(name, value)
+        if name in _PAGE_ELEMENT_KEYS:
+            super().__setattr__('_by_page', None)
+            super().__setattr__('_bboxes_by_page', None)
+        elif name == 'pages':
+            super().__setattr__('_pages_by_num', None)
+    
+    def invalidate_page_index(self) -> None:
+        """使页面索引失效（原地修改元素列表或页面列表后调用）"""
+        self._by_page = None
+        self._bboxes_by_page = None
+        self._pages_by_num = None
+    
+    def _build_page_index(self) -> Dict[int, Dict[str, list]]:
+        """一次遍历所有元素，按页面分桶"""
+        by_page: Dict[int, Dict[str, list]] = {}
+        for key in _PAGE_ELEMENT_KEYS:
+            for elem in getattr(self, key):
+                bucket = by_page.get(elem.page)
+                if bucket is None:
+                    bucket = by_page[elem.page] = {k: [] for k in _PAGE_ELEMENT_KEYS}
+                bucket[key].append(elem)
+        return by_page
+    
+    def _get_page_index(self) -> Dict[int, Dict[str, list]]:
+        """获取页面索引，首次调用时在锁内构建"""
+        by_page = self._by_page
+        if by_page is None:
+            with _PAGE_INDEX_LOCK:
+                by_page = self._by_page
+                if by_page is None:
+                    by_page = self._by_page = self._build_page_index()
+        return by_page
+    
+    def get_elements_by_page(self, page_num: int, copy: bool = True) -> Dict[str, List]:
+        """
+        获取指定页面的所有元素（线程安全）
+        
+        Args:
+            page_num: 页面号
+            copy: 为False时直接返回页面索引中的列表，省去复制，
+                调用方只能读取，不得修改
+        """
+        bucket = self._get_page_index().get(page_num)
+        if bucket is None:
+            return {key: [] for key in _PAGE_ELEMENT_KEYS}
+        if not copy:
+            return bucket
+        return {key: list(elems) for key, elems in bucket.items()}
+    
+    def get_page_bboxes(self, page_num: int) -> Dict[str, "np.ndarray"]:
+        """
+        获取指定页面各类元素的边界框数组（列式存储）
+        
+        每类元素对应一个(N, 4)的float64数组，行顺序与get_elements_by_page
+        返回的列表一致，列依次为x0, y0, x1, y1；缺少边界框的元素对应行为NaN。
+        """
+        if np is None:
+            raise ImportError("get_page_bboxes需要安装numpy")
+        
+        bboxes_by_page = self._bboxes_by_page
+        arrays = bboxes_by_page.get(page_num) if bboxes_by_page is not None else None
+        if arrays is None:
+            with _PAGE_INDEX_LOCK:
+                if self._bboxes_by_page is None:
+                    self._bboxes_by_page = {}
+                arrays = self._bboxes_by_page.get(page_num)
+                if arrays is None:
+                    bucket = self._get_page_index().get(page_num, {})
+                    arrays = {key: _bbox_array(bucket.get(key, ())) for key in _PAGE_ELEMENT_KEYS}
+                    self._bboxes_by_page[page_num] = arrays
+        return arrays
+    
+    def get_page(self, page_num: int) -> Optional[PageInfo]:
+        """获取指定页码的页面信息，不存在时返回None"""
+        pages_by_num = self._pages_by_num
+        if pages_by_num is None:
+            pages_by_num = {}
+            for page_info in self.pages or ():
+                pages_by_num.setdefault(page_info.number, page_info)
+            self._pages_by_num = pages_by_num
+        return pages_by_num.get(page_num)
     
     def get_page_count(self) -> int:
         """获取页面总数"""
@@ -7,7 +7,8 @@ PDF解析器接口
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 from pathlib import Path
 
 from .models import (
@@ -175,6 +176,33 @@ class BasePDFParser(PDFParserInterface):
             if key not in self.config:
                 self.config[key] = value
     
+    def _load_source(self, pdf_path: Path) -> Dict[str, Any]:
+        """
+        预先加载PDF内容，返回传给各提取方法的额外参数
+        
+        默认不预加载，各提取方法自行按路径打开文件。
+        """
+        return {}
+    
+    @contextmanager
+    def _open_source(self, pdf_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        在一次解析期间提供传给各提取方法的额外参数，退出时释放其中的资源
+        
+        默认只调用_load_source，子类可以在此打开共享的文档对象。
+        """
+        yield self._load_source(pdf_path)
+    
+    def _extract_text_and_tables(self, pdf_path: Path,
+                                 **source: Any) -> Tuple[List[TextBlock], List[Table]]:
+        """
+        提取文本和表格
+        
+        默认分别调用extract_text和extract_tables，子类可以合并为一次遍历。
+        """
+        return (self.extract_text(pdf_path, **source),
+                self.extract_tables(pdf_path, **source))
+    
     def parse_document(self, pdf_path: Path) -> ParsedDocument:
         """
         解析PDF文档
@@ -189,12 +217,16 @@ class BasePDFParser(PDFParserInterface):
             raise PDFParseError(f"无效的PDF文件: {pdf_path}")
         
         try:
-            # 提取各种内容
-            metadata = self.extract_metadata(pdf_path)
-            pages = self.get_page_info(pdf_path)
-            text_blocks = self.extract_text(pdf_path)
-            tables = self.extract_tables(pdf_path) if self.config.get('extract_tables') else []
-            images = self.extract_images(pdf_path) if self.config.get('extract_images') else []
+            # 文件内容只读取一次，各提取方法共用
+            with self._open_source(pdf_path) as source:
+                # 提取各种内容
+                metadata = self.extract_metadata(pdf_path, **source)
+                pages = self.get_page_info(pdf_path, **source)
+                if self.config.get('extract_tables'):
+                    text_blocks, tables = self._extract_text_and_tables(pdf_path, **source)
+                else:
+                    text_blocks, tables = self.extract_text(pdf_path, **source), []
+                images = self.extract_images(pdf_path, **source) if self.config.get('extract_images') else []
             
             # 创建解析后的文档对象
             return ParsedDocument(
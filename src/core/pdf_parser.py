@@ -9,27 +9,170 @@
 from __future__ import annotations
 
 import io
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import replace
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Sequence, Iterator
 import logging
 
+import numpy as np
+
 try:
     import pdfplumber
+    from pdfplumber.table import TableSettings
     import fitz  # PyMuPDF
-    from PIL import Image as PILImage
 except ImportError as e:
     raise ImportError(f"缺少必要的依赖包: {e}")
 
+# 可选导入：Numba可用时对数值内核进行JIT编译
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 from .parser_interface import BasePDFParser
 from .models import (
     TextBlock, Table, Image, DocumentMetadata, PageInfo,
-    BoundingBox, FontInfo, TextStyle, TableCell, ElementType,
+    BoundingBox, FontInfo, TextStyle, make_font, TableCell, ElementType,
     PDFParseError
 )
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
+# MuPDF不支持多线程并发访问（即使是不同的文档对象），进程内的fitz调用需串行
+_FITZ_LOCK = threading.RLock()
+
+
+def _reset_fitz_lock() -> None:
+    """在fork出的子进程中重建_FITZ_LOCK：fork时由其他线程持有的锁在子进程中永远不会释放"""
+    global _FITZ_LOCK
+    _FITZ_LOCK = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_fitz_lock)
+
+# 按页并行的进程池使用spawn方式启动：提取在线程池中进行，fork时其他线程
+# 可能正持有_FITZ_LOCK，fork出的子进程继承已加锁的副本会永久阻塞；
+# spawn子进程重新导入模块，只按路径重新打开PDF
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# PyMuPDF文本字典的提取选项：备选文本提取不需要图像块，去掉后不再复制图像数据
+_TEXT_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# 表头特征词（匹配小写化后的单元格文本）
+_HEADER_RE = re.compile('|'.join(map(re.escape, [
+    '名称', '标题', 'name', 'title', '类型', 'type', '编号', 'id'
+])))
+
+# 文档元数据缓存：(路径, 修改时间, 文件大小) -> DocumentMetadata，文件变化时自动失效
+_METADATA_CACHE: "OrderedDict[Tuple[str, int, int], DocumentMetadata]" = OrderedDict()
+_METADATA_CACHE_SIZE = 128
+_METADATA_CACHE_LOCK = threading.Lock()
+
+
+def _ensure_pil():
+    """按需导入PIL（只在PyMuPDF未给出图像尺寸时使用）"""
+    try:
+        from PIL import Image as PILImage
+    except ImportError as e:
+        raise ImportError(f"缺少必要的依赖包: {e}")
+    return PILImage
+
+
+def _file_cache_key(pdf_path: Path) -> Optional[Tuple[str, int, int]]:
+    """根据文件路径和stat信息生成缓存键，文件不可访问时返回None"""
+    try:
+        stat = pdf_path.stat()
+    except OSError:
+        return None
+    return str(pdf_path), stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=256)
+def _styles_from_font_name(font_name: str) -> TextStyle:
+    """根据字体名称推断文本样式（文档中字体种类很少，结果缓存）"""
+    lowered = font_name.lower()
+    styles = TextStyle.NORMAL
+    if 'bold' in lowered:
+        styles |= TextStyle.BOLD
+    if 'italic' in lowered:
+        styles |= TextStyle.ITALIC
+    return styles
+
+
+@lru_cache(maxsize=256)
+def _styles_from_flags(flags: int) -> TextStyle:
+    """根据PyMuPDF的字体标志获取文本样式（结果缓存）"""
+    styles = TextStyle.NORMAL
+    if flags & 2**4:  # 粗体
+        styles |= TextStyle.BOLD
+    if flags & 2**1:  # 斜体
+        styles |= TextStyle.ITALIC
+    return styles
+
+
+def _group_lines_loop(top: np.ndarray, x0: np.ndarray, x1: np.ndarray,
+                      bottom: np.ndarray, tolerance: float
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+    """一次遍历已排序的字符，检测断行并归约每行的边界框（Numba内核）"""
+    n = top.shape[0]
+    starts = np.empty(n, dtype=np.int64)
+    bboxes = np.empty((n, 4), dtype=np.float64)
+    count = 0
+    for i in range(n):
+        if i == 0 or top[i] - top[i - 1] > tolerance:
+            starts[count] = i
+            bboxes[count, 0] = x0[i]
+            bboxes[count, 1] = top[i]
+            bboxes[count, 2] = x1[i]
+            bboxes[count, 3] = bottom[i]
+            count += 1
+        else:
+            k = count - 1
+            bboxes[k, 0] = min(bboxes[k, 0], x0[i])
+            bboxes[k, 1] = min(bboxes[k, 1], top[i])
+            bboxes[k, 2] = max(bboxes[k, 2], x1[i])
+            bboxes[k, 3] = max(bboxes[k, 3], bottom[i])
+    return starts[:count], bboxes[:count]
+
+
+def _group_lines_numpy(top: np.ndarray, x0: np.ndarray, x1: np.ndarray,
+                       bottom: np.ndarray, tolerance: float
+                       ) -> Tuple[np.ndarray, np.ndarray]:
+    """向量化检测断行并分段归约边界框（无Numba时的回退实现）"""
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(top) > tolerance) + 1))
+    bboxes = np.column_stack((
+        np.minimum.reduceat(x0, starts),
+        np.minimum.reduceat(top, starts),
+        np.maximum.reduceat(x1, starts),
+        np.maximum.reduceat(bottom, starts),
+    ))
+    return starts, bboxes
+
+
+if _HAS_NUMBA:
+    _group_lines = njit(cache=True, boundscheck=False)(_group_lines_loop)
+else:
+    _group_lines = _group_lines_numpy
+
+
+def _extract_pages_worker(parser_cls: type, config: Dict[str, Any], kind: str,
+                          pdf_path: str, page_indices: Sequence[int]) -> list:
+    """进程池任务：在子进程中重新打开PDF并提取指定页面的内容"""
+    parser = parser_cls(config)
+    return parser._extract_page_range(kind, Path(pdf_path), page_indices)
+
 
 class HybridPDFParser(BasePDFParser):
     """混合PDF解析器"""
@@ -44,7 +187,13 @@ class HybridPDFParser(BasePDFParser):
             'use_pymupdf_for_images': True,
             'use_pdfplumber_for_tables': True,
             'use_pymupdf_for_styles': True,
-            'text_extraction_method': 'layout',  # layout, simple
+            'text_extraction_method': 'layout',  # layout, simple, words
+            'word_x_tolerance': 3,  # words模式下单词内字符的水平容差
+            # 按页并行解析参数
+            'parallel_pages': True,  # 是否使用进程池按页并行解析
+            'max_workers': min(os.cpu_count() or 1, 4),  # 最大进程数
+            'parallel_min_pages': 8,  # 少于此页数时顺序解析，避免进程启动开销
+            'in_memory_max_mb': 200,  # 不超过此大小的文件一次读入内存，所有提取器共用
             'table_settings': {
                 'vertical_strategy': 'lines',
                 'horizontal_strategy': 'lines',
@@ -56,22 +205,117 @@ class HybridPDFParser(BasePDFParser):
         for key, value in hybrid_config.items():
             if key not in self.config:
                 self.config[key] = value
+        
+        # 表格检测参数只解析一次，各页面共用
+        try:
+            self._table_settings = TableSettings.resolve(self.config['table_settings'])
+        except ValueError as e:
+            # 保留原始配置，在提取表格时再报告错误
+            logger.warning(f"表格检测参数无效: {e}")
+            self._table_settings = self.config['table_settings']
+    
+    def _load_source(self, pdf_path: Path) -> Dict[str, Any]:
+        """
+        一次读取PDF文件内容，供各提取器共用
+        
+        超过in_memory_max_mb的大文件仍按路径打开，避免内存占用翻倍。
+        """
+        try:
+            if pdf_path.stat().st_size > self.config['in_memory_max_mb'] * 1024 * 1024:
+                return {}
+            return {'pdf_stream': pdf_path.read_bytes()}
+        except OSError as e:
+            logger.warning(f"读取PDF文件失败，改为按路径打开: {e}")
+            return {}
+    
+    @contextmanager
+    def _open_source(self, pdf_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        读取文件内容并打开一个共享的PyMuPDF文档，退出时关闭
+        
+        元数据、页面信息和图像提取共用该文档，不再各自解析一次交叉引用表；
+        打开失败时不提供共享文档，由各提取方法自行打开并处理错误。
+        """
+        source = self._load_source(pdf_path)
+        try:
+            with _FITZ_LOCK:
+                fitz_doc = self._open_fitz(pdf_path, source.get('pdf_stream'))
+        except Exception as e:
+            logger.debug(f"打开共享PyMuPDF文档失败: {e}")
+            fitz_doc = None
+        
+        if fitz_doc is None:
+            yield source
+            return
+        try:
+            yield {**source, 'fitz_doc': fitz_doc}
+        finally:
+            with _FITZ_LOCK:
+                fitz_doc.close()
+    
+    @staticmethod
+    def _open_pdfplumber(pdf_path: Path, pdf_stream: Optional[bytes] = None,
+                         pages: Optional[List[int]] = None):
+        """
+        打开pdfplumber文档，优先使用内存中的文件内容
+        
+        pages为页码列表（从1开始）时只加载这些页面。
+        """
+        if pdf_stream is not None:
+            return pdfplumber.open(io.BytesIO(pdf_stream), pages=pages)
+        return pdfplumber.open(pdf_path, pages=pages)
     
-    def extract_metadata(self, pdf_path: Path) -> DocumentMetadata:
+    @staticmethod
+    def _open_fitz(pdf_path: Path, pdf_stream: Optional[bytes] = None):
+        """打开PyMuPDF文档，优先使用内存中的文件内容"""
+        if pdf_stream is not None:
+            return fitz.open(stream=pdf_stream, filetype="pdf")
+        return fitz.open(pdf_path)
+    
+    @staticmethod
+    @contextmanager
+    def _fitz_document(pdf_path: Path, pdf_stream: Optional[bytes] = None,
+                       fitz_doc=None):
+        """
+        获取PyMuPDF文档：有共享文档时直接使用（不关闭），否则打开并在退出时关闭
+        
+        调用方需持有_FITZ_LOCK。
+        """
+        if fitz_doc is not None:
+            yield fitz_doc
+            return
+        with HybridPDFParser._open_fitz(pdf_path, pdf_stream) as doc:
+            yield doc
+    
+    def extract_metadata(self, pdf_path: Path,
+                         pdf_stream: Optional[bytes] = None,
+                         fitz_doc=None) -> DocumentMetadata:
         """
         提取文档元数据
         
         Args:
             pdf_path: PDF文件路径
+            pdf_stream: 可选的PDF文件内容，提供时不再读取文件
+            fitz_doc: 可选的共享PyMuPDF文档，提供时不再打开文件
             
         Returns:
             DocumentMetadata: 文档元数据
         """
+        cache_key = _file_cache_key(pdf_path)
+        if cache_key is not None:
+            with _METADATA_CACHE_LOCK:
+                cached = _METADATA_CACHE.get(cache_key)
+                if cached is not None:
+                    _METADATA_CACHE.move_to_end(cache_key)
+            if cached is not None:
+                # 返回副本，避免调用方修改缓存
+                return replace(cached)
+        
         try:
-            with fitz.open(pdf_path) as doc:
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
                 metadata = doc.metadata
                 
-                return DocumentMetadata(
+                result = DocumentMetadata(
                     title=metadata.get('title'),
                     author=metadata.get('author'),
                     subject=metadata.get('subject'),
@@ -85,13 +329,25 @@ class HybridPDFParser(BasePDFParser):
         except Exception as e:
             logger.warning(f"提取元数据失败: {e}")
             return DocumentMetadata(pages=0)
+        
+        if cache_key is not None:
+            with _METADATA_CACHE_LOCK:
+                _METADATA_CACHE[cache_key] = result
+                if len(_METADATA_CACHE) > _METADATA_CACHE_SIZE:
+                    _METADATA_CACHE.popitem(last=False)
+        
+        return replace(result)
     
-    def get_page_info(self, pdf_path: Path) -> List[PageInfo]:
+    def get_page_info(self, pdf_path: Path,
+                      pdf_stream: Optional[bytes] = None,
+                      fitz_doc=None) -> List[PageInfo]:
         """
         获取页面信息
         
         Args:
             pdf_path: PDF文件路径
+            pdf_stream: 可选的PDF文件内容，提供时不再读取文件
+            fitz_doc: 可选的共享PyMuPDF文档，提供时不再打开文件
             
         Returns:
             List[PageInfo]: 页面信息列表
@@ -99,7 +355,7 @@ class HybridPDFParser(BasePDFParser):
         pages = []
         
         try:
-            with fitz.open(pdf_path) as doc:
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
                 for page_num, page in enumerate(doc):
                     rect = page.rect
                     pages.append(PageInfo(
@@ -115,106 +371,114 @@ class HybridPDFParser(BasePDFParser):
         
         return pages
     
-    def extract_text(self, pdf_path: Path) -> List[TextBlock]:
+    def extract_text(self, pdf_path: Path,
+                     pdf_stream: Optional[bytes] = None,
+                     max_pages: Optional[int] = None,
+                     fitz_doc=None) -> List[TextBlock]:
         """
         提取文本内容
         
         Args:
             pdf_path: PDF文件路径
+            pdf_stream: 可选的PDF文件内容，提供时不再读取文件
+            max_pages: 只处理前几页，None表示全部页面
+            fitz_doc: 可选的共享PyMuPDF文档，提供时不再打开文件
             
         Returns:
             List[TextBlock]: 文本块列表
         """
-        text_blocks = []
-        
         try:
             # 使用pdfplumber提取文本布局
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    # 提取字符级别的信息
-                    chars = page.chars
-                    
-                    # 按行分组字符
-                    lines = self._group_chars_into_lines(chars)
-                    
-                    for line in lines:
-                        if not line:
-                            continue
-                        
-                        # 合并行中的字符
-                        text = ''.join(char['text'] for char in line)
-                        if not text.strip():
-                            continue
-                        
-                        # 计算边界框
-                        bbox = self._calculate_bbox_from_chars(line)
-                        
-                        # 获取字体信息
-                        font_info = self._extract_font_info_from_chars(line)
-                        
-                        # 创建文本块
-                        text_block = TextBlock(
-                            text=text,
-                            page=page_num + 1,
-                            bbox=bbox,
-                            font=font_info,
-                            element_type=ElementType.TEXT
-                        )
-                        
-                        text_blocks.append(text_block)
+            text_blocks = self._extract_pages('text', pdf_path, pdf_stream, max_pages)
                         
         except Exception as e:
             logger.error(f"提取文本失败: {e}")
             # 如果pdfplumber失败，尝试使用PyMuPDF
-            text_blocks = self._extract_text_with_pymupdf(pdf_path)
+            text_blocks = self._extract_text_with_pymupdf(pdf_path, pdf_stream, max_pages,
+                                                          fitz_doc)
+        
+        return text_blocks
+    
+    def _extract_text_from_page(self, page, page_num: int) -> List[TextBlock]:
+        """提取单个pdfplumber页面的文本块"""
+        text_blocks = []
+        
+        if self.config['text_extraction_method'] == 'words':
+            # 由pdfplumber先合并为单词，再按行分组，单词之间以空格连接
+            units = page.extract_words(
+                x_tolerance=self.config['word_x_tolerance'],
+                y_tolerance=2,
+                extra_attrs=['fontname', 'size']
+            )
+            separator = ' '
+        else:
+            # 提取字符级别的信息
+            units = page.chars
+            separator = ''
+        
+        # 按行分组，同时得到每行的边界框
+        lines, line_bboxes = self._group_chars_into_lines(units)
+        
+        for line, (x0, y0, x1, y1) in zip(lines, line_bboxes):
+            if not line:
+                continue
+            
+            # 合并行中的字符（或单词）
+            text = separator.join(unit['text'] for unit in line)
+            if not text.strip():
+                continue
+            
+            bbox = BoundingBox(x0, y0, x1, y1)
+            
+            # 获取字体信息
+            font_info = self._extract_font_info_from_chars(line)
+            
+            # 创建文本块
+            text_block = TextBlock(
+                text=text,
+                page=page_num,
+                bbox=bbox,
+                font=font_info,
+                element_type=ElementType.TEXT
+            )
+            
+            text_blocks.append(text_block)
         
         return text_blocks
     
-    def _extract_text_with_pymupdf(self, pdf_path: Path) -> List[TextBlock]:
+    def _extract_text_with_pymupdf(self, pdf_path: Path,
+                                   pdf_stream: Optional[bytes] = None,
+                                   max_pages: Optional[int] = None,
+                                   fitz_doc=None) -> List[TextBlock]:
         """使用PyMuPDF提取文本作为备选方案"""
         text_blocks = []
         
         try:
-            with fitz.open(pdf_path) as doc:
-                for page_num, page in enumerate(doc):
-                    # 获取文本字典
-                    text_dict = page.get_text("dict")
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
+                page_count = self._page_limit(doc.page_count, max_pages)
+                for page_num, page in enumerate(doc.pages(0, page_count), 1):
+                    # 获取文本字典（字体信息只有dict模式提供）
+                    text_dict = page.get_text("dict", flags=_TEXT_DICT_FLAGS)
                     
-                    for block in text_dict["blocks"]:
-                        if "lines" not in block:
-                            continue
-                        
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                text = span["text"].strip()
-                                if not text:
-                                    continue
-                                
-                                # 创建边界框
-                                bbox = BoundingBox(
-                                    x0=span["bbox"][0],
-                                    y0=span["bbox"][1],
-                                    x1=span["bbox"][2],
-                                    y1=span["bbox"][3]
-                                )
-                                
-                                # 创建字体信息
-                                font_info = FontInfo(
-                                    name=span["font"],
-                                    size=span["size"],
-                                    color=(0, 0, 0),  # 默认黑色
-                                    styles=self._get_text_styles_from_flags(span["flags"])
-                                )
-                                
-                                text_block = TextBlock(
-                                    text=text,
-                                    page=page_num + 1,
-                                    bbox=bbox,
-                                    font=font_info,
-                                    element_type=ElementType.TEXT
-                                )
-                                
-                                text_blocks.append(text_block)
+                    # 每个非空span生成一个文本块，跳过非文本块
+                    text_blocks.extend(
+                        TextBlock(
+                            text=text,
+                            page=page_num,
+                            bbox=BoundingBox(*span["bbox"]),
+                            font=make_font(
+                                name=span["font"],
+                                size=span["size"],
+                                color=0x000000,  # 默认黑色
+                                styles=_styles_from_flags(span["flags"])
+                            ),
+                            element_type=ElementType.TEXT
+                        )
+                        for block in text_dict["blocks"] if block.get("type") == 0
+                        for line in block["lines"]
+                        for span in line["spans"]
+                        if (text := span["text"].strip())
+                    )
                                 
         except Exception as e:
             logger.error(f"PyMuPDF文本提取失败: {e}")
@@ -222,12 +486,18 @@ class HybridPDFParser(BasePDFParser):
         
         return text_blocks
     
-    def extract_tables(self, pdf_path: Path) -> List[Table]:
+    def extract_tables(self, pdf_path: Path,
+                       pdf_stream: Optional[bytes] = None,
+                       max_pages: Optional[int] = None,
+                       fitz_doc=None) -> List[Table]:
         """
         提取表格
         
         Args:
             pdf_path: PDF文件路径
+            pdf_stream: 可选的PDF文件内容，提供时不再读取文件
+            max_pages: 只处理前几页，None表示全部页面
+            fitz_doc: 共享PyMuPDF文档（表格提取不使用，便于统一传参）
             
         Returns:
             List[Table]: 表格列表
@@ -235,74 +505,109 @@ class HybridPDFParser(BasePDFParser):
         tables = []
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    # 使用pdfplumber的表格检测
-                    page_tables = page.find_tables(
-                        table_settings=self.config['table_settings']
-                    )
-                    
-                    for table_data in page_tables:
-                        # 提取表格数据
-                        table_array = table_data.extract()
-                        if not table_array:
-                            continue
-                        
-                        # 过滤空表格
-                        rows = len(table_array)
-                        cols = len(table_array[0]) if table_array else 0
-                        
-                        if (rows < self.config['min_table_rows'] or 
-                            cols < self.config['min_table_cols']):
-                            continue
-                        
-                        # 创建表格单元格
-                        cells = []
-                        for row_idx, row in enumerate(table_array):
-                            for col_idx, cell_text in enumerate(row):
-                                if cell_text is None:
-                                    cell_text = ""
-                                
-                                cell = TableCell(
-                                    text=str(cell_text),
-                                    row=row_idx,
-                                    col=col_idx
-                                )
-                                cells.append(cell)
-                        
-                        # 创建表格边界框
-                        bbox = BoundingBox(
-                            x0=table_data.bbox[0],
-                            y0=table_data.bbox[1],
-                            x1=table_data.bbox[2],
-                            y1=table_data.bbox[3]
-                        )
-                        
-                        # 检测是否有表头
-                        has_header = self._detect_table_header(table_array)
-                        
-                        table = Table(
-                            cells=cells,
-                            page=page_num + 1,
-                            bbox=bbox,
-                            rows=rows,
-                            cols=cols,
-                            has_header=has_header
-                        )
-                        
-                        tables.append(table)
+            tables = self._extract_pages('tables', pdf_path, pdf_stream, max_pages)
                         
         except Exception as e:
             logger.error(f"提取表格失败: {e}")
         
         return tables
     
-    def extract_images(self, pdf_path: Path) -> List[Image]:
+    def _extract_text_and_tables(self, pdf_path: Path,
+                                 pdf_stream: Optional[bytes] = None,
+                                 max_pages: Optional[int] = None,
+                                 fitz_doc=None
+                                 ) -> Tuple[List[TextBlock], List[Table]]:
+        """
+        一次遍历pdfplumber页面同时提取文本和表格
+        
+        两者共用同一个已解析的页面对象；合并提取失败时分别调用
+        extract_text和extract_tables，保持各自的容错行为。
+        """
+        try:
+            results = self._extract_pages('text_tables', pdf_path, pdf_stream, max_pages)
+        except Exception as e:
+            logger.warning(f"合并提取文本和表格失败，改为分别提取: {e}")
+            return (self.extract_text(pdf_path, pdf_stream, max_pages, fitz_doc),
+                    self.extract_tables(pdf_path, pdf_stream, max_pages))
+        
+        text_blocks = [item for item in results if isinstance(item, TextBlock)]
+        tables = [item for item in results if isinstance(item, Table)]
+        return text_blocks, tables
+    
+    def _extract_text_and_tables_from_page(self, page, page_num: int) -> list:
+        """提取单个pdfplumber页面的文本块和表格"""
+        return (self._extract_text_from_page(page, page_num) +
+                self._extract_tables_from_page(page, page_num))
+    
+    def _extract_tables_from_page(self, page, page_num: int) -> List[Table]:
+        """提取单个pdfplumber页面的表格"""
+        tables = []
+        min_rows = self.config['min_table_rows']
+        min_cols = self.config['min_table_cols']
+        
+        # 使用pdfplumber的表格检测
+        page_tables = page.find_tables(table_settings=self._table_settings)
+        
+        for table_data in page_tables:
+            # 提取表格数据
+            table_array = table_data.extract()
+            if not table_array:
+                continue
+            
+            # 过滤空表格
+            rows = len(table_array)
+            cols = len(table_array[0]) if table_array else 0
+            
+            if rows < min_rows or cols < min_cols:
+                continue
+            
+            # 创建表格单元格
+            cells = [
+                TableCell(
+                    text="" if cell_text is None else str(cell_text),
+                    row=row_idx,
+                    col=col_idx
+                )
+                for row_idx, row in enumerate(table_array)
+                for col_idx, cell_text in enumerate(row)
+            ]
+            
+            # 创建表格边界框
+            bbox = BoundingBox(
+                x0=table_data.bbox[0],
+                y0=table_data.bbox[1],
+                x1=table_data.bbox[2],
+                y1=table_data.bbox[3]
+            )
+            
+            # 检测是否有表头
+            has_header = self._detect_table_header(table_array)
+            
+            table = Table(
+                cells=cells,
+                page=page_num,
+                bbox=bbox,
+                rows=rows,
+                cols=cols,
+                has_header=has_header
+            )
+            
+            tables.append(table)
+        
+        return tables
+    
+    def extract_images(self, pdf_path: Path,
+                       pdf_stream: Optional[bytes] = None,
+                       max_pages: Optional[int] = None,
+                       fitz_doc=None) -> List[Image]:
         """
         提取图像
         
         Args:
             pdf_path: PDF文件路径
+            pdf_stream: 可选的PDF文件内容，提供时不再读取文件
+            max_pages: 只处理前几页，None表示全部页面
+            fitz_doc: 可选的共享PyMuPDF文档，提供时不再打开文件
             
         Returns:
             List[Image]: 图像列表
@@ -310,108 +615,265 @@ class HybridPDFParser(BasePDFParser):
         images = []
         
         try:
-            with fitz.open(pdf_path) as doc:
-                for page_num, page in enumerate(doc):
-                    image_list = page.get_images()
-                    
-                    for img_index, img in enumerate(image_list):
-                        # 获取图像引用
-                        xref = img[0]
-                        
-                        # 提取图像数据
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        image_ext = base_image["ext"]
-                        
-                        # 获取图像信息
-                        pil_image = PILImage.open(io.BytesIO(image_bytes))
-                        width, height = pil_image.size
-                        
-                        # 过滤小图像
-                        if (width < self.config['image_min_width'] or 
-                            height < self.config['image_min_height']):
-                            continue
-                        
-                        # 获取图像位置（近似）
-                        image_rects = page.get_image_rects(xref)
-                        if image_rects:
-                            rect = image_rects[0]
-                            bbox = BoundingBox(
-                                x0=rect.x0,
-                                y0=rect.y0,
-                                x1=rect.x1,
-                                y1=rect.y1
-                            )
-                        else:
-                            # 默认边界框
-                            bbox = BoundingBox(x0=0, y0=0, x1=width, y1=height)
-                        
-                        # 生成文件名
-                        filename = f"image_p{page_num + 1}_{img_index + 1}.{image_ext}"
-                        
-                        image_obj = Image(
-                            data=image_bytes,
-                            page=page_num + 1,
-                            bbox=bbox,
-                            format=image_ext,
-                            filename=filename,
-                            width=width,
-                            height=height
-                        )
-                        
-                        images.append(image_obj)
+            images = self._extract_pages('images', pdf_path, pdf_stream, max_pages, fitz_doc)
                         
         except Exception as e:
             logger.error(f"提取图像失败: {e}")
         
         return images
     
-    def _group_chars_into_lines(self, chars: List[Dict]) -> List[List[Dict]]:
-        """将字符按行分组"""
-        if not chars:
-            return []
-        
-        # 按y坐标排序
-        sorted_chars = sorted(chars, key=lambda c: (c['top'], c['x0']))
+    def _extract_images_from_page(self, doc, page, page_num: int,
+                                  image_cache: Optional[Dict[int, Tuple[bytes, str, int, int]]] = None
+                                  ) -> List[Image]:
+        """
+        提取单个PyMuPDF页面的图像
         
-        lines = []
-        current_line = []
-        current_y = None
-        tolerance = 2  # y坐标容差
+        Args:
+            doc: PyMuPDF文档
+            page: PyMuPDF页面
+            page_num: 页码（从1开始）
+            image_cache: 跨页面共享的xref -> (数据, 格式, 宽, 高)缓存，
+                多个页面引用的同一图像只提取一次
+        """
+        images = []
+        if image_cache is None:
+            image_cache = {}
+        image_list = page.get_images()
         
-        for char in sorted_chars:
-            char_y = char['top']
+        for img_index, img in enumerate(image_list):
+            # 获取图像引用
+            xref = img[0]
+            
+            # 图像字典中的宽高已可判断是否为小图像，无需提取数据
+            if (img[2] < self.config['image_min_width'] or
+                img[3] < self.config['image_min_height']):
+                continue
+            
+            cached = image_cache.get(xref)
+            if cached is None:
+                # 提取图像数据
+                base_image = doc.extract_image(xref)
+                image_bytes = base_image["image"]
+                image_ext = base_image["ext"]
+                
+                # 获取图像信息（PyMuPDF已给出尺寸，缺失时才用PIL读取图像头）
+                width = base_image.get("width") or 0
+                height = base_image.get("height") or 0
+                if not width or not height:
+                    width, height = _ensure_pil().open(io.BytesIO(image_bytes)).size
+                
+                image_cache[xref] = (image_bytes, image_ext, width, height)
+            else:
+                # 已提取过的图像共用同一份数据
+                image_bytes, image_ext, width, height = cached
             
-            if current_y is None or abs(char_y - current_y) <= tolerance:
-                current_line.append(char)
-                current_y = char_y
+            # 过滤小图像
+            if (width < self.config['image_min_width'] or 
+                height < self.config['image_min_height']):
+                continue
+            
+            # 获取图像位置（近似）
+            image_rects = page.get_image_rects(xref)
+            if image_rects:
+                rect = image_rects[0]
+                bbox = BoundingBox(
+                    x0=rect.x0,
+                    y0=rect.y0,
+                    x1=rect.x1,
+                    y1=rect.y1
+                )
             else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = [char]
-                current_y = char_y
+                # 默认边界框
+                bbox = BoundingBox(x0=0, y0=0, x1=width, y1=height)
+            
+            # 生成文件名
+            filename = f"image_p{page_num}_{img_index + 1}.{image_ext}"
+            
+            image_obj = Image(
+                data=image_bytes,
+                page=page_num,
+                bbox=bbox,
+                format=image_ext,
+                filename=filename,
+                width=width,
+                height=height
+            )
+            
+            images.append(image_obj)
+        
+        return images
+    
+    def _extract_page_range(self, kind: str, pdf_path: Path,
+                            page_indices: Optional[Sequence[int]] = None,
+                            pdf_stream: Optional[bytes] = None,
+                            max_pages: Optional[int] = None,
+                            fitz_doc=None) -> list:
+        """
+        顺序提取指定页面的内容
+        
+        Args:
+            kind: 内容类型，'text'、'tables'、'text_tables'（一次遍历同时提取
+                文本和表格，结果混在同一列表中）或'images'
+            pdf_path: PDF文件路径
+            page_indices: 页面索引（从0开始，升序），None表示全部页面
+            pdf_stream: 可选的PDF文件内容
+            max_pages: 未指定page_indices时只处理前几页
+            fitz_doc: 可选的共享PyMuPDF文档（仅图像提取使用）
+        """
+        results = []
+        if page_indices is None and max_pages is not None:
+            page_indices = range(max_pages)
+        
+        if kind == 'images':
+            image_cache = {}
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
+                if page_indices is None:
+                    indices = range(doc.page_count)
+                else:
+                    indices = [i for i in page_indices if i < doc.page_count]
+                for page_index in indices:
+                    results.extend(self._extract_images_from_page(
+                        doc, doc[page_index], page_index + 1, image_cache
+                    ))
+            return results
+        
+        if kind == 'text':
+            extract_page = self._extract_text_from_page
+        elif kind == 'tables':
+            extract_page = self._extract_tables_from_page
+        else:
+            extract_page = self._extract_text_and_tables_from_page
+        # 指定页面时只让pdfplumber加载这些页面，不构建其余页面对象
+        page_numbers = None if page_indices is None else [i + 1 for i in page_indices]
+        with self._open_pdfplumber(pdf_path, pdf_stream, page_numbers) as pdf:
+            for page in pdf.pages:
+                results.extend(extract_page(page, page.page_number))
+                # pdf.pages持有全部页面对象，释放已处理页面缓存的字符和版面对象，
+                # 避免内存随页数线性增长
+                page.flush_cache()
+        return results
+    
+    @staticmethod
+    def _has_images(doc) -> bool:
+        """文档的对象表中是否有图像对象"""
+        return any(doc.xref_is_image(xref) for xref in range(1, doc.xref_length()))
+    
+    @staticmethod
+    def _page_limit(page_count: int, max_pages: Optional[int] = None) -> int:
+        """实际需要处理的页数"""
+        return page_count if max_pages is None else min(page_count, max_pages)
+    
+    def _get_page_workers(self, kind: str, pdf_path: Path,
+                          pdf_stream: Optional[bytes] = None,
+                          max_pages: Optional[int] = None,
+                          fitz_doc=None) -> Tuple[int, int]:
+        """获取(并行进程数, 需要处理的页数)，不满足并行条件时进程数为1"""
+        max_workers = self.config['max_workers'] or 1
+        if not self.config['parallel_pages'] or max_workers <= 1:
+            return 1, 0
+        
+        # 使用与提取相同的库获取页数，避免pdfplumber提取等待fitz锁
+        if kind == 'images':
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
+                page_count = doc.page_count
+        else:
+            with self._open_pdfplumber(pdf_path, pdf_stream) as pdf:
+                page_count = len(pdf.pages)
+        page_count = self._page_limit(page_count, max_pages)
+        
+        if page_count < self.config['parallel_min_pages']:
+            return 1, page_count
+        return min(max_workers, page_count), page_count
+    
+    def _extract_pages(self, kind: str, pdf_path: Path,
+                       pdf_stream: Optional[bytes] = None,
+                       max_pages: Optional[int] = None,
+                       fitz_doc=None) -> list:
+        """
+        按页提取内容，页数较多时使用进程池并行
         
-        if current_line:
-            lines.append(current_line)
+        每个子进程按路径重新打开PDF（文档对象不可pickle，也避免把文件内容
+        复制到每个进程），处理一段连续页面，结果按页面顺序合并。
+        """
+        if kind == 'images':
+            # 纯文本文档不逐页查找图像，也不启动进程池；对象表只在这里扫描一次
+            with _FITZ_LOCK, self._fitz_document(pdf_path, pdf_stream, fitz_doc) as doc:
+                if not self._has_images(doc):
+                    return []
+        
+        workers, page_count = self._get_page_workers(kind, pdf_path, pdf_stream,
+                                                     max_pages, fitz_doc)
+        if workers <= 1:
+            return self._extract_page_range(kind, pdf_path, pdf_stream=pdf_stream,
+                                            max_pages=max_pages, fitz_doc=fitz_doc)
+        
+        # 连续分段，每个进程只打开一次PDF
+        chunk_size = -(-page_count // workers)
+        chunks = [range(start, min(start + chunk_size, page_count))
+                  for start in range(0, page_count, chunk_size)]
         
-        return lines
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT) as executor:
+                futures = [
+                    executor.submit(_extract_pages_worker, type(self), self.config,
+                                    kind, str(pdf_path), chunk)
+                    for chunk in chunks
+                ]
+                results = []
+                for future in futures:
+                    results.extend(future.result())
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"并行解析失败，改为顺序解析: {e}")
+            return self._extract_page_range(kind, pdf_path, pdf_stream=pdf_stream,
+                                            max_pages=max_pages, fitz_doc=fitz_doc)
+        
+        if kind in ('text', 'text_tables'):
+            # 子进程返回的字体是副本，重新合并为共享实例
+            for block in results:
+                if isinstance(block, TextBlock):
+                    font = block.font
+                    block.font = make_font(font.name, font.size, font.color, font.styles)
+        
+        return results
     
-    def _calculate_bbox_from_chars(self, chars: List[Dict]) -> BoundingBox:
-        """从字符列表计算边界框"""
-        if not chars:
-            return BoundingBox(0, 0, 0, 0)
+    def _group_chars_into_lines(self, chars: List[Dict]
+                                ) -> Tuple[List[List[Dict]], List[List[float]]]:
+        """
+        将字符按行分组
+        
+        字符按(top, x0)排序后，相邻字符top之差超过容差处断行；
+        每行的边界框用分段归约一次算出。
         
-        x0 = min(char['x0'] for char in chars)
-        y0 = min(char['top'] for char in chars)
-        x1 = max(char['x1'] for char in chars)
-        y1 = max(char['bottom'] for char in chars)
+        Returns:
+            (行列表, 每行的[x0, top, x1, bottom]边界框)
+        """
+        if not chars:
+            return [], []
         
-        return BoundingBox(x0, y0, x1, y1)
+        tolerance = 2  # y坐标容差
+        count = len(chars)
+        top = np.fromiter((c['top'] for c in chars), dtype=np.float64, count=count)
+        x0 = np.fromiter((c['x0'] for c in chars), dtype=np.float64, count=count)
+        x1 = np.fromiter((c['x1'] for c in chars), dtype=np.float64, count=count)
+        bottom = np.fromiter((c['bottom'] for c in chars), dtype=np.float64, count=count)
+        
+        # 按y坐标排序（稳定排序，与sorted一致）
+        order = np.lexsort((x0, top))
+        starts, line_bboxes = _group_lines(top[order], x0[order], x1[order],
+                                           bottom[order], float(tolerance))
+        line_bboxes = line_bboxes.tolist()
+        
+        order = order.tolist()
+        bounds = starts.tolist() + [count]
+        lines = [[chars[i] for i in order[start:end]]
+                 for start, end in zip(bounds, bounds[1:])]
+        
+        return lines, line_bboxes
     
     def _extract_font_info_from_chars(self, chars: List[Dict]) -> FontInfo:
         """从字符列表提取字体信息"""
         if not chars:
-            return FontInfo("default", 12, (0, 0, 0), [TextStyle.NORMAL])
+            return make_font("default", 12, 0x000000, TextStyle.NORMAL)
         
         # 使用第一个字符的字体信息
         first_char = chars[0]
@@ -419,31 +881,16 @@ class HybridPDFParser(BasePDFParser):
         font_name = first_char.get('fontname', 'default')
         font_size = first_char.get('size', 12)
         
-        # 简单的样式检测
-        styles = [TextStyle.NORMAL]
-        if 'bold' in font_name.lower():
-            styles.append(TextStyle.BOLD)
-        if 'italic' in font_name.lower():
-            styles.append(TextStyle.ITALIC)
-        
-        return FontInfo(
+        return make_font(
             name=font_name,
             size=font_size,
-            color=(0, 0, 0),  # 默认黑色
-            styles=styles
+            color=0x000000,  # 默认黑色
+            styles=_styles_from_font_name(font_name)  # 简单的样式检测
         )
     
-    def _get_text_styles_from_flags(self, flags: int) -> List[TextStyle]:
+    def _get_text_styles_from_flags(self, flags: int) -> TextStyle:
         """从PyMuPDF的flags获取文本样式"""
-        styles = [TextStyle.NORMAL]
-        
-        # PyMuPDF字体标志
-        if flags & 2**4:  # 粗体
-            styles.append(TextStyle.BOLD)
-        if flags & 2**1:  # 斜体
-            styles.append(TextStyle.ITALIC)
-        
-        return styles
+        return _styles_from_flags(flags)
     
     def _detect_table_header(self, table_array: List[List]) -> bool:
         """检测表格是否有表头"""
@@ -456,10 +903,5 @@ class HybridPDFParser(BasePDFParser):
             return False
         
         # 检查是否包含常见的表头特征
-        header_indicators = ['名称', '标题', 'name', 'title', '类型', 'type', '编号', 'id']
-        
-        for cell in first_row:
-            if cell and any(indicator in str(cell).lower() for indicator in header_indicators):
-                return True
-        
-        return False
+        search = _HEADER_RE.search
+        return any(search(str(cell).lower()) for cell in first_row if cell)
@@ -6,9 +6,15 @@ PDF转Typst处理流水线
 
 from __future__ import annotations
 
+import copy
+import multiprocessing
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple, Union
 import logging
 
 from .pdf_parser import HybridPDFParser
@@ -18,6 +24,21 @@ from .models import ParsedDocument, TypstDocument, PDFParseError, TypstGeneratio
 
 logger = logging.getLogger(__name__)
 
+# 批量转换的进程池使用spawn方式启动，子进程不继承父进程中其他线程持有的锁，
+# 只按路径重新打开PDF
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+
+def _convert_file_worker(config: Dict[str, Any], pdf_path: str, output_path: str) -> int:
+    """
+    子进程中转换单个文件（模块级函数，可被进程池pickle）
+    
+    Returns:
+        int: 生成文档中的图像数量
+    """
+    pipeline = PDFToTypstPipeline(config)
+    return len(pipeline.convert(Path(pdf_path), Path(output_path)).images)
+
 
 class PDFToTypstPipeline:
     """PDF转Typst处理流水线"""
@@ -39,6 +60,9 @@ class PDFToTypstPipeline:
         
         # 进度回调函数
         self.progress_callback: Optional[Callable[[str, float], None]] = None
+        
+        # 文档信息缓存：(路径, 修改时间, 文件大小) -> 信息，文件变化时自动失效
+        self._cached_document_info = lru_cache(maxsize=128)(self._collect_document_info)
     
     def _setup_config(self):
         """设置默认配置"""
@@ -48,6 +72,9 @@ class PDFToTypstPipeline:
             'create_output_dir': True,
             'overwrite_existing': False,
             'log_level': 'INFO',
+            'parallel_extraction': True,  # 并发执行文本、表格、图像提取
+            'parallel_batch': True,  # 批量转换时多个文件并行
+            'batch_workers': min(os.cpu_count() or 1, 4),
         }
         
         for key, value in default_config.items():
@@ -93,18 +120,18 @@ class PDFToTypstPipeline:
             # 验证输入
             self._validate_input(pdf_path, output_path)
             
-            # 第一阶段：PDF解析
+            # 第一阶段：PDF解析（内容分析与图像提取重叠进行）
             self._update_progress("PDF解析", 0)
-            parsed_doc = self.parser.parse_document(pdf_path)
+            parsed_doc = self._parse_document(pdf_path, analyze=True)
             self._update_progress("PDF解析", 100)
             
             logger.info(f"解析完成: {len(parsed_doc.text_blocks)} 个文本块, "
                        f"{len(parsed_doc.tables)} 个表格, "
                        f"{len(parsed_doc.images)} 个图像")
             
-            # 第二阶段：内容分析
+            # 第二阶段：内容分析（已在解析阶段完成）
             self._update_progress("内容分析", 0)
-            analyzed_doc = self.analyzer.analyze_document(parsed_doc)
+            analyzed_doc = parsed_doc
             self._update_progress("内容分析", 100)
             
             logger.info(f"分析完成: {len(analyzed_doc.headings)} 个标题, "
@@ -148,6 +175,88 @@ class PDFToTypstPipeline:
             logger.error(f"转换失败: {str(e)}")
             raise
     
+    def _parse_document(self, pdf_path: Path,
+                        max_pages: Optional[int] = None,
+                        analyze: bool = False) -> ParsedDocument:
+        """
+        解析PDF文档
+        
+        启用parallel_extraction时，文本与表格（一次页面遍历）、图像提取在线程池中
+        并发执行（共用一次读入的文件内容和PyMuPDF文档），元数据和页面信息
+        在当前线程提交图像任务之前提取；
+        否则使用解析器的顺序parse_document。
+        
+        max_pages只限制文本、表格和图像的提取范围，元数据和页面信息仍覆盖全文；
+        顺序解析时不生效，由调用方按页过滤。
+        
+        analyze为True时同时完成内容分析：内容分析只依赖文本块，并发解析时在
+        文本和表格提取完成后立即开始，与仍在进行的图像提取重叠。
+        """
+        parser = self.parser
+        if not self.config['parallel_extraction']:
+            parsed_doc = parser.parse_document(pdf_path)
+            return self.analyzer.analyze_document(parsed_doc) if analyze else parsed_doc
+        
+        if not parser.validate_pdf(pdf_path):
+            raise PDFParseError(f"无效的PDF文件: {pdf_path}")
+        
+        analysis_error: Optional[Exception] = None
+        try:
+            # 文件内容只读取一次，各提取任务共用；线程池先于共享文档退出
+            with parser._open_source(pdf_path) as source, \
+                    ThreadPoolExecutor(max_workers=2) as executor:
+                extract_args = dict(source)
+                if max_pages is not None:
+                    extract_args['max_pages'] = max_pages
+                
+                # 文本和表格由解析器合并为一次页面遍历
+                if parser.config.get('extract_tables'):
+                    content_future = executor.submit(parser._extract_text_and_tables,
+                                                     pdf_path, **extract_args)
+                else:
+                    text_future = executor.submit(parser.extract_text, pdf_path, **extract_args)
+                    content_future = None
+                
+                # 图像提取在整个页面遍历期间持有_FITZ_LOCK，元数据和页面信息
+                # 需要在提交图像任务之前读取，否则要等图像全部提取完
+                metadata = parser.extract_metadata(pdf_path, **source)
+                pages = parser.get_page_info(pdf_path, **source)
+                
+                images_future = (executor.submit(parser.extract_images, pdf_path, **extract_args)
+                                 if parser.config.get('extract_images') else None)
+                
+                if content_future is not None:
+                    text_blocks, tables = content_future.result()
+                else:
+                    text_blocks, tables = text_future.result(), []
+                
+                parsed_doc = ParsedDocument(
+                    metadata=metadata,
+                    pages=pages,
+                    text_blocks=text_blocks,
+                    tables=tables,
+                    images=[],  # 图像提取完成后填入
+                    headings=[],  # 将在后续步骤中分析
+                    paragraphs=[],  # 将在后续步骤中分析
+                    lists=[]  # 将在后续步骤中分析
+                )
+                if analyze:
+                    try:
+                        parsed_doc = self.analyzer.analyze_document(parsed_doc)
+                    except Exception as e:
+                        # 分析错误不属于解析错误，等图像提取结束后原样抛出
+                        analysis_error = e
+                
+                if images_future is not None:
+                    parsed_doc.images = images_future.result()
+            
+        except Exception as e:
+            raise PDFParseError(f"解析PDF文档失败: {str(e)}") from e
+        
+        if analysis_error is not None:
+            raise analysis_error
+        return parsed_doc
+    
     def convert_batch(self, input_dir: Path, output_dir: Path, 
                      pattern: str = "*.pdf") -> Dict[str, Any]:
         """
@@ -176,38 +285,87 @@ class PDFToTypstPipeline:
             "files": []
         }
         
-        for i, pdf_path in enumerate(pdf_files):
-            try:
-                # 生成输出路径
-                output_file = output_dir / f"{pdf_path.stem}.typ"
-                
-                # 转换文件
-                logger.info(f"转换文件 {i+1}/{len(pdf_files)}: {pdf_path.name}")
-                
-                typst_doc = self.convert(pdf_path, output_file)
-                
-                results["success"] += 1
-                results["files"].append({
-                    "input": str(pdf_path),
-                    "output": str(output_file),
-                    "status": "success",
-                    "images": len(typst_doc.images)
-                })
-                
-            except Exception as e:
-                logger.error(f"转换失败 {pdf_path.name}: {str(e)}")
+        # 生成输出路径
+        jobs = [(pdf_path, output_dir / f"{pdf_path.stem}.typ") for pdf_path in pdf_files]
+        
+        workers = min(self.config['batch_workers'] or 1, len(jobs))
+        if self.config['parallel_batch'] and len(jobs) > 2 and workers > 1:
+            outcomes = self._convert_batch_parallel(jobs, workers)
+        else:
+            outcomes = (self._convert_batch_file(i, len(jobs), pdf_path, output_file)
+                        for i, (pdf_path, output_file) in enumerate(jobs))
+        
+        for (pdf_path, output_file), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"转换失败 {pdf_path.name}: {str(outcome)}")
                 
                 results["failed"] += 1
                 results["files"].append({
                     "input": str(pdf_path),
                     "output": "",
                     "status": "failed",
-                    "error": str(e)
+                    "error": str(outcome)
+                })
+            else:
+                results["success"] += 1
+                results["files"].append({
+                    "input": str(pdf_path),
+                    "output": str(output_file),
+                    "status": "success",
+                    "images": outcome
                 })
         
         logger.info(f"批量转换完成: {results['success']} 成功, {results['failed']} 失败")
         return results
     
+    def _convert_batch_file(self, index: int, total: int, pdf_path: Path,
+                            output_file: Path) -> Union[int, Exception]:
+        """在当前进程转换批量中的一个文件，返回图像数量，失败时返回异常"""
+        try:
+            logger.info(f"转换文件 {index+1}/{total}: {pdf_path.name}")
+            return len(self.convert(pdf_path, output_file).images)
+        except Exception as e:
+            return e
+    
+    def _convert_batch_parallel(self, jobs: List[Tuple[Path, Path]],
+                                workers: int) -> List[Union[int, Exception]]:
+        """
+        使用进程池并行转换，结果顺序与jobs一致
+        
+        每个子进程按配置新建流水线；进程池不可用时剩余文件改为顺序转换。
+        子进程中的流水线没有进度回调，由当前进程在每个文件完成时按
+        "批量转换"阶段报告进度。
+        """
+        config = copy.deepcopy(self.config)
+        # 文件级已经并行，子进程内不再按页启用进程池，避免进程数叠加
+        config['parser'] = {**config.get('parser', {}), 'parallel_pages': False}
+        
+        total = len(jobs)
+        outcomes: List[Union[int, Exception]] = []
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT) as executor:
+                futures = [
+                    executor.submit(_convert_file_worker, config, str(pdf_path), str(output_file))
+                    for pdf_path, output_file in jobs
+                ]
+                for i, (future, (pdf_path, _)) in enumerate(zip(futures, jobs)):
+                    try:
+                        outcomes.append(future.result())
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        outcomes.append(e)
+                    logger.info(f"转换文件 {i+1}/{total}: {pdf_path.name}")
+                    self._update_progress("批量转换", (i + 1) / total * 100)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"并行批量转换失败，剩余文件改为顺序转换: {e}")
+            outcomes.extend(
+                self._convert_batch_file(i, total, pdf_path, output_file)
+                for i, (pdf_path, output_file) in enumerate(jobs[len(outcomes):], len(outcomes))
+            )
+        
+        return outcomes
+    
     def _validate_input(self, pdf_path: Path, output_path: Path):
         """验证输入参数"""
         # 验证PDF文件
@@ -243,38 +401,57 @@ class PDFToTypstPipeline:
             if not self.parser.validate_pdf(pdf_path):
                 return {"error": "无效的PDF文件"}
             
-            # 提取基本信息
-            metadata = self.parser.extract_metadata(pdf_path)
-            pages = self.parser.get_page_info(pdf_path)
-            
-            # 快速统计
-            text_blocks = self.parser.extract_text(pdf_path)
-            tables = self.parser.extract_tables(pdf_path) if self.config.get('extract_tables', True) else []
-            images = self.parser.extract_images(pdf_path) if self.config.get('extract_images', True) else []
-            
-            return {
-                "file_path": str(pdf_path),
-                "file_size_mb": pdf_path.stat().st_size / (1024 * 1024),
-                "metadata": metadata.to_dict(),
-                "pages": len(pages),
-                "text_blocks": len(text_blocks),
-                "tables": len(tables),
-                "images": len(images),
-                "page_info": [
-                    {
-                        "number": page.number,
-                        "width": page.width,
-                        "height": page.height,
-                        "aspect_ratio": page.aspect_ratio
-                    }
-                    for page in pages[:5]  # 只返回前5页信息
-                ]
-            }
+            # 同一文件未修改时直接使用缓存结果
+            stat = pdf_path.stat()
+            info = self._cached_document_info(str(pdf_path), stat.st_mtime_ns, stat.st_size)
+            return copy.deepcopy(info)
             
         except Exception as e:
             logger.error(f"获取文档信息失败: {str(e)}")
             return {"error": str(e)}
     
+    def _collect_document_info(self, path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+        """
+        提取PDF文档信息（经lru_cache按文件路径、修改时间和大小缓存）
+        
+        Args:
+            path_str: PDF文件路径
+            mtime_ns: 文件修改时间（纳秒），仅用作缓存键
+            size: 文件大小（字节）
+        """
+        pdf_path = Path(path_str)
+        
+        with self.parser._open_source(pdf_path) as source:
+            # 提取基本信息
+            metadata = self.parser.extract_metadata(pdf_path, **source)
+            pages = self.parser.get_page_info(pdf_path, **source)
+            
+            # 快速统计
+            text_blocks = self.parser.extract_text(pdf_path, **source)
+            tables = (self.parser.extract_tables(pdf_path, **source)
+                      if self.config.get('extract_tables', True) else [])
+            images = (self.parser.extract_images(pdf_path, **source)
+                      if self.config.get('extract_images', True) else [])
+        
+        return {
+            "file_path": path_str,
+            "file_size_mb": size / (1024 * 1024),
+            "metadata": metadata.to_dict(),
+            "pages": len(pages),
+            "text_blocks": len(text_blocks),
+            "tables": len(tables),
+            "images": len(images),
+            "page_info": [
+                {
+                    "number": page.number,
+                    "width": page.width,
+                    "height": page.height,
+                    "aspect_ratio": page.aspect_ratio
+                }
+                for page in pages[:5]  # 只返回前5页信息
+            ]
+        }
+    
     def preview_conversion(self, pdf_path: Path, max_pages: int = 3) -> Dict[str, Any]:
         """
         预览转换结果（只处理前几页）
@@ -289,10 +466,10 @@ class PDFToTypstPipeline:
         try:
             logger.info(f"预览转换: {pdf_path} (前{max_pages}页)")
             
-            # 解析文档
-            parsed_doc = self.parser.parse_document(pdf_path)
+            # 解析文档，只提取前几页的内容
+            parsed_doc = self._parse_document(pdf_path, max_pages=max_pages)
             
-            # 只保留前几页的内容
+            # 顺序解析时仍是全文内容，只保留前几页
             parsed_doc.text_blocks = [
                 block for block in parsed_doc.text_blocks 
                 if block.page <= max_pages
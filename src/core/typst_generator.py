@@ -6,11 +6,24 @@ Typst生成器
 
 from __future__ import annotations
 
+import io
+import multiprocessing
 import re
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Tuple
 import logging
 
+# 可选导入：Numba可用时对数值内核进行JIT编译
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
 from .models import (
     ParsedDocument, TypstDocument, TextBlock, Table, Image,
     Heading, Paragraph, List as DocList, ListItem,
@@ -20,6 +33,283 @@ from .layout_analyzer import LayoutAnalyzer, PageLayout, LayoutRegion
 
 logger = logging.getLogger(__name__)
 
+# 文本清理使用的正则表达式（模块加载时编译一次）
+# 混合内容分离：句号后直接跟大写字母、全大写单词相连、数字与字母相连
+_SENTENCE_JOIN_RE = re.compile(r'\.([A-Z])')
+_CAPS_RUN_RE = re.compile(r'([A-Z]{3,})([A-Z]{3,})')
+_DIGIT_ALPHA_RE = re.compile(r'(\d+)([A-Za-z])')
+_ALPHA_DIGIT_RE = re.compile(r'([A-Za-z])(\d+)')
+# 以上四条规则都需要大写字母或数字才可能匹配
+_MIXED_TRIGGER_RE = re.compile(r'[A-Z\d]')
+
+# 常见的单词连接错误及其修正
+_COMMON_FIXES = (
+    ('inButterflyfishes', 'in Butterflyfishes'),
+    ('towardstheir', 'towards their'),
+    ('manyoccasions', 'many occasions'),
+    ('cleanlyother', 'cleanly other'),
+    ('specieswith', 'species with'),
+    ('suchfish', 'such fish'),
+    ('sidetheir', 'side their'),
+    ('linesoccasions', 'lines occasions'),
+    ('orWhen', 'or When'),
+    ('pelewensisandC', 'pelewensis and C'),
+    ('butorgans', 'but organs'),
+    ('speciesadult', 'species adult'),
+    ('ABERRATIONSSURVIVORS', 'ABERRATIONS SURVIVORS'),
+)
+_COMMON_FIXES_RE = re.compile('|'.join(re.escape(wrong) for wrong, _ in _COMMON_FIXES))
+
+# 标题编号前缀
+_HEADING_NUMBER_RE = re.compile(r'^(\d+(?:\.\d+)*\s*)')
+_HEADING_CHAPTER_RE = re.compile(r'^(第[一二三四五六七八九十\d]+[章节]\s*)')
+
+# 常见的非标题内容（按子串匹配，合并为一次扫描）
+_NON_HEADING_RE = re.compile('|'.join(map(re.escape, (
+    'such as', 'for example', 'in many cases', 'occasionally',
+    'depending on', 'when', 'where', 'which', 'that'
+))))
+
+# 列表标记：项目符号、数字、字母、中文数字、括号数字
+# 合并为一个正则，各标记按上述顺序可选匹配，一次扫描即可移除依次出现的多个标记
+# （如"• 1. "），与按顺序逐个移除的结果一致
+_LIST_MARKER_RE = re.compile('^' + ''.join(
+    rf'(?:\s*{marker}\s*)?' for marker in (
+        r'[•·▪▫◦‣⁃]',
+        r'\d+[.、]',
+        r'[a-zA-Z][.、)]',
+        r'[一二三四五六七八九十]+[.、)]',
+        r'[(（]\d+[)）]',
+    )
+))
+
+# Typst特殊字符转义表（单字符映射，str.translate一次完成）
+# 反斜杠最后转义，特殊字符前插入的反斜杠也会被转义，即'#'转为'\\\\#'
+_TYPST_ESCAPE_TABLE = str.maketrans({
+    **{char: '\\\\' + char for char in '#@$*_`[]<>'},
+    '\\': '\\\\',
+})
+# 需要转义的字符，不含这些字符的文本无需translate
+_TYPST_SPECIAL_RE = re.compile(r'[#@$*_`\[\]<>\\]')
+
+# 列表项缩进字符串（按 级别-1 索引，更深的级别临时计算）
+_LIST_INDENTS = tuple("  " * depth for depth in range(8))
+
+# 按页生成的进程池使用spawn方式启动，子进程不继承父进程中其他线程持有的锁
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# 页面边距 (10mm = 28.35pt)
+_PAGE_MARGIN_PT = 28.35
+
+
+def _quantize_hundredths(value: float) -> Tuple[float, bool]:
+    """
+    用整数运算将value舍入到两位小数（Numba内核）
+    
+    结果与round(value, 2)一致；乘法误差可能影响进位的情况
+    （接近.5的边界）以及负数、NaN返回(value, False)，交给round处理。
+    """
+    scaled = value * 100.0
+    if 0.0 <= scaled < 1e9:
+        whole = int(scaled)
+        frac = scaled - whole
+        if abs(frac - 0.5) > 1e-6:
+            if frac > 0.5:
+                whole += 1
+            return whole / 100.0, True
+    return value, False
+
+
+# 模块经Cython编译（见setup.py）后函数不再是Python函数，Numba无法处理，使用纯Python内核
+if _HAS_NUMBA and not isinstance(_quantize_hundredths, types.FunctionType):
+    _HAS_NUMBA = False
+
+if _HAS_NUMBA:
+    _quantize_hundredths = njit(cache=True)(_quantize_hundredths)
+
+
+def _calc_pos_kernel(x0: float, y0: float, x1: float, y1: float,
+                     page_width: float, page_height: float, quantize: bool
+                     ) -> Tuple[float, float, float, float, int, int]:
+    """
+    计算元素相对内容区域的位置和尺寸百分比（Numba内核）
+    
+    返回(top, left, width, height, int_mask, rounded_mask)。
+    int_mask按位标记原实现中被截断为整数常量的分量（1=top, 2=left,
+    4=width, 8=height），格式化时据此输出"95%"而不是"95.0%"。
+    quantize为True时在内核中完成两位小数的舍入，rounded_mask按同样的位
+    标记已舍入的分量；未舍入的分量仍由调用方使用round处理。纯Python执行时
+    round本身更快，因此只在Numba编译后启用。
+    """
+    # 转换PDF坐标到Typst坐标（PDF原点在左下角，Typst在左上角）
+    # 使用y1（顶部）来计算top位置，这样元素顶部对应Typst的dy位置
+    top_pt = max(0.0, min(page_height - y1, page_height))
+    left_pt = max(0.0, min(x0, page_width))
+    content_width = page_width - 2 * _PAGE_MARGIN_PT
+    content_height = page_height - 2 * _PAGE_MARGIN_PT
+    int_mask = 0
+    
+    # 转换为相对单位（相对于内容区域）
+    left_rel = (left_pt - _PAGE_MARGIN_PT) / content_width * 100
+    if not left_rel > 0:
+        left_rel = 0.0
+        int_mask |= 2
+    top_rel = (top_pt - _PAGE_MARGIN_PT) / content_height * 100
+    if not top_rel > 0:
+        top_rel = 0.0
+        int_mask |= 1
+    width_rel = (x1 - x0) / content_width * 100
+    height_rel = (y1 - y0) / content_height * 100
+    
+    # 确保元素不超出页面边界
+    if left_rel + width_rel > 100:
+        width_rel = 100 - left_rel
+        if int_mask & 2:
+            int_mask |= 4
+        if not width_rel > 10:
+            width_rel = 10.0
+            int_mask |= 4
+    if top_rel + height_rel > 100:
+        height_rel = 100 - top_rel
+        if int_mask & 1:
+            int_mask |= 8
+        if not height_rel > 5:
+            height_rel = 5.0
+            int_mask |= 8
+    
+    # 强制限制top和left在合理范围内
+    if top_rel > 95:
+        top_rel = 95.0
+        int_mask |= 1
+    if left_rel > 90:
+        left_rel = 90.0
+        int_mask |= 2
+    
+    # 限制最大尺寸（宽80%、高60%）与最小尺寸（宽10%、高5%）
+    if width_rel > 80:
+        width_rel = 80.0
+        int_mask |= 4
+    if width_rel < 10:
+        width_rel = 10.0
+        int_mask |= 4
+    if height_rel > 60:
+        height_rel = 60.0
+        int_mask |= 8
+    if height_rel < 5:
+        height_rel = 5.0
+        int_mask |= 8
+    
+    rounded_mask = 0
+    if quantize:
+        top_rel, rounded = _quantize_hundredths(top_rel)
+        if rounded:
+            rounded_mask |= 1
+        left_rel, rounded = _quantize_hundredths(left_rel)
+        if rounded:
+            rounded_mask |= 2
+        width_rel, rounded = _quantize_hundredths(width_rel)
+        if rounded:
+            rounded_mask |= 4
+        height_rel, rounded = _quantize_hundredths(height_rel)
+        if rounded:
+            rounded_mask |= 8
+    
+    return top_rel, left_rel, width_rel, height_rel, int_mask, rounded_mask
+
+
+if _HAS_NUMBA:
+    _calc_pos = njit(cache=True)(_calc_pos_kernel)
+else:
+    _calc_pos = _calc_pos_kernel
+
+
+class _Pos(NamedTuple):
+    """元素的绝对位置：百分比字符串及其数值"""
+    top: str
+    left: str
+    width: str
+    height: str
+    top_f: float
+    left_f: float
+    width_f: float
+    height_f: float
+
+
+# 绝对定位元素的#place包装模板，后者将内容放入指定宽度的box
+_PLACE_TMPL = '#place(\n  dx: {left},\n  dy: {top},\n)[{body}]'
+_PLACE_BOX_TMPL = '#place(\n  dx: {left},\n  dy: {top},\n)[#box(width: {width})[{body}]]'
+
+
+@lru_cache(maxsize=4096)
+def _format_abs_position(x0: float, y0: float, x1: float, y1: float,
+                         page_width: float, page_height: float
+                         ) -> _Pos:
+    """
+    计算并格式化元素的绝对位置（结果缓存）
+    
+    页眉、页脚、重复的表格等在各页的边界框往往完全相同，
+    按原始坐标缓存即可命中，不做量化以免改变输出。
+    """
+    top_rel, left_rel, width_rel, height_rel, int_mask, rounded_mask = _calc_pos(
+        x0, y0, x1, y1, page_width, page_height, _HAS_NUMBA
+    )
+    
+    # 四舍五入（内核未能舍入的分量使用内置round，结果一致）
+    top = (int(top_rel) if int_mask & 1 else
+           top_rel if rounded_mask & 1 else round(top_rel, 2))
+    left = (int(left_rel) if int_mask & 2 else
+            left_rel if rounded_mask & 2 else round(left_rel, 2))
+    width = (int(width_rel) if int_mask & 4 else
+             width_rel if rounded_mask & 4 else round(width_rel, 2))
+    height = (int(height_rel) if int_mask & 8 else
+              height_rel if rounded_mask & 8 else round(height_rel, 2))
+    return _Pos(f"{top}%", f"{left}%", f"{width}%", f"{height}%",
+                float(top), float(left), float(width), float(height))
+
+
+@lru_cache(maxsize=64)
+def _build_page_settings(width_mm: float, height_mm: float, suffix: str) -> str:
+    """
+    生成按页面尺寸设置的文档头部（结果缓存）
+    
+    Args:
+        width_mm: 页面宽度（毫米）
+        height_mm: 页面高度（毫米）
+        suffix: 尺寸之后的固定部分，由生成器配置预先生成
+    """
+    return f"#set page(\n  width: {width_mm}mm,\n  height: {height_mm}{suffix}"
+
+
+@lru_cache(maxsize=1024)
+def _format_indent_pad(rel_x: float) -> str:
+    """
+    生成按相对横坐标缩进的#pad前缀（结果缓存）
+    
+    rel_x已按精度取整，同一页面上的缩进值种类很少，缓存可省去round和格式化。
+    """
+    return f"#pad(left: {round(rel_x / 10, 1)}em)"
+
+
+@lru_cache(maxsize=128)
+def _map_font_name(font_name: str, mapping_items: Tuple[Tuple[str, str], ...],
+                   default: str) -> str:
+    """
+    按子串匹配映射字体族（结果缓存）
+    
+    Args:
+        font_name: PDF中的字体名
+        mapping_items: (子串, 字体族) 对，按匹配优先级排列
+        default: 没有匹配时返回的字体族
+    """
+    font_lower = font_name.lower()
+    
+    for key, mapped_font in mapping_items:
+        if key in font_lower:
+            return mapped_font
+    
+    # 如果没有匹配，返回默认字体
+    return default
+
 
 class TypstGenerator:
     """Typst生成器"""
@@ -34,12 +324,19 @@ class TypstGenerator:
         self.config = config or {}
         self._setup_config()
         
-        # 字体映射表
+        # 字体映射表，冻结为 (子串, 字体族) 元组供逐个匹配
         self._font_mapping = self._create_font_mapping()
+        self._font_mapping_items = tuple(self._font_mapping.items())
         
         # 样式模板
         self._templates = self._load_templates()
         
+        # 文档头部只依赖配置，预先生成
+        self._prepare_header_fragments()
+        
+        # 图像路径索引：(路径列表, 文件名 -> 路径)，同一列表只建立一次
+        self._image_index: Optional[Tuple[List[str], Dict[str, str]]] = None
+        
         # 布局分析器
         self.layout_analyzer = LayoutAnalyzer(self.config.get('layout_config', {}))
     
@@ -80,11 +377,45 @@ class TypstGenerator:
             'detect_columns': True,
             'preserve_text_wrapping': True,
             'maintain_spacing': True,
+            
+            # 并行设置
+            'page_workers': 1,  # 按页并行生成的最大线程/进程数，默认不并行（页面生成受GIL限制，线程池没有加速）
+            'page_executor': 'thread',  # 按页并行的方式：thread（线程）或 process（多进程，绕开GIL）
+            'image_workers': 8,  # 并行写入图像文件的最大线程数
         }
         
         for key, value in default_config.items():
             if key not in self.config:
                 self.config[key] = value
+        
+        # 逐页、逐元素读取的布局开关，缓存为实例属性
+        self._preserve_layout = self.config['preserve_layout']
+        self._use_precise_positioning = self.config['use_precise_positioning']
+        self._detect_columns = self.config['detect_columns']
+        self._maintain_spacing = self.config['maintain_spacing']
+        
+        # 逐个表格、图像读取的样式设置
+        self._table_stroke = self.config['table_stroke']
+        self._table_fill = self.config['table_fill']
+        self._image_width = self.config['image_width']
+        self._image_center = self.config['image_alignment'] == 'center'
+        self._font_family = self.config['font_family']
+    
+    def reload_config(self, config: Optional[Dict] = None):
+        """
+        重新加载配置
+        
+        直接修改self.config或字体映射表后需要调用，以同步缓存的配置属性、
+        字体映射元组和预先生成的文档头部。
+        
+        Args:
+            config: 需要合并到当前配置中的配置项
+        """
+        if config:
+            self.config.update(config)
+        self._setup_config()
+        self._font_mapping_items = tuple(self._font_mapping.items())
+        self._prepare_header_fragments()
     
     def _create_font_mapping(self) -> Dict[str, str]:
         """创建字体映射表"""
@@ -156,6 +487,46 @@ class TypstGenerator:
 '''
         }
     
+    def _prepare_header_fragments(self):
+        """
+        预先生成文档头部
+        
+        默认头部完全由配置决定，直接生成完整字符串；按页面尺寸生成的头部
+        只有宽高两处随文档变化，宽高之后的部分预先生成，
+        完整结果由_build_page_settings按尺寸缓存。
+        """
+        config = self.config
+        self._default_header = self._templates['document_header'].format(
+            paper_size=config['paper_size'],
+            margin=config['margin'],
+            font_family=config['font_family'],
+            font_size=config['font_size'],
+            line_spacing=config['line_spacing'],
+            paragraph_indent=config['paragraph_indent'],
+            paragraph_spacing=config['paragraph_spacing']
+        )
+        
+        self._page_header_suffix = f'''mm,
+  margin: (x: 10mm, y: 10mm),
+)
+
+#set text(
+  font: "{config['font_family']}",
+  size: {config['font_size']},
+  lang: "zh",
+)
+
+#set par(
+  leading: {config['line_spacing']},
+  spacing: {config['paragraph_spacing']},
+)
+
+#set heading(
+  numbering: "1.1.1.1.1.1",
+)
+
+'''
+    
     def generate_document(self, parsed_doc: ParsedDocument, 
                          output_dir: Optional[Path] = None) -> TypstDocument:
         """
@@ -170,31 +541,38 @@ class TypstGenerator:
         """
         logger.info("开始生成Typst文档")
         
-        content_parts = []
+        # 各部分之间以换行分隔，直接写入同一个缓冲区
+        buf = io.StringIO()
         image_paths = []
         
         # 1. 文档头部设置
-        content_parts.append(self._generate_document_header(parsed_doc))
+        buf.write(self._generate_document_header(parsed_doc))
         
         # 2. 标题页（如果有元数据）
         if self.config['include_metadata'] and parsed_doc.metadata.title:
-            content_parts.append(self._generate_title_page(parsed_doc.metadata))
+            buf.write('\n')
+            buf.write(self._generate_title_page(parsed_doc.metadata))
         
         # 3. 目录（如果需要且有多个标题）
         if (self.config['include_toc'] and parsed_doc.headings and 
             len(parsed_doc.headings) > 3):  # 只有超过3个标题才生成目录
-            content_parts.append(self._generate_toc())
+            buf.write('\n')
+            buf.write(self._generate_toc())
         
         # 4. 保存图像文件
         if output_dir:
             image_paths = self._save_images(parsed_doc.images, output_dir)
         
-        # 5. 生成主要内容
-        main_content = self._generate_main_content(parsed_doc, image_paths)
-        content_parts.append(main_content)
+        # 5. 生成主要内容（片段之间以空行分隔）
+        main_parts: List[str] = []
+        self._write_main_content(parsed_doc, image_paths, main_parts)
+        buf.write('\n')
+        for index, part in enumerate(main_parts):
+            if index:
+                buf.write('\n\n')
+            buf.write(part)
         
-        # 合并所有内容
-        full_content = '\n'.join(content_parts)
+        full_content = buf.getvalue()
         
         # 创建Typst文档对象
         typst_doc = TypstDocument(
@@ -218,15 +596,7 @@ class TypstGenerator:
             return self._generate_dynamic_page_settings(page_info)
         else:
             # 回退到默认模板
-            return self._templates['document_header'].format(
-                paper_size=self.config['paper_size'],
-                margin=self.config['margin'],
-                font_family=self.config['font_family'],
-                font_size=self.config['font_size'],
-                line_spacing=self.config['line_spacing'],
-                paragraph_indent=self.config['paragraph_indent'],
-                paragraph_spacing=self.config['paragraph_spacing']
-            )
+            return self._default_header
     
     def _generate_dynamic_page_settings(self, page_info) -> str:
         """根据真实页面信息生成页面设置"""
@@ -234,34 +604,8 @@ class TypstGenerator:
         width_mm = round(page_info.width * 0.352778, 1)  # 1pt = 0.352778mm
         height_mm = round(page_info.height * 0.352778, 1)
         
-        # 判断页面方向
-        is_landscape = page_info.width > page_info.height
-        
-        # 生成页面设置
-        page_settings = f'''#set page(
-  width: {width_mm}mm,
-  height: {height_mm}mm,
-  margin: (x: 10mm, y: 10mm),
-)
-
-#set text(
-  font: "{self.config['font_family']}",
-  size: {self.config['font_size']},
-  lang: "zh",
-)
-
-#set par(
-  leading: {self.config['line_spacing']},
-  spacing: {self.config['paragraph_spacing']},
-)
-
-#set heading(
-  numbering: "1.1.1.1.1.1",
-)
-
-'''
-        
-        return page_settings
+        # 常见页面尺寸有限，生成结果按尺寸和配置缓存
+        return _build_page_settings(width_mm, height_mm, self._page_header_suffix)
     
     def _generate_title_page(self, metadata) -> str:
         """生成标题页"""
@@ -281,109 +625,164 @@ class TypstGenerator:
     
     def _generate_main_content(self, parsed_doc: ParsedDocument, 
                               image_paths: List[str]) -> str:
-        """生成主要内容"""
-        content_parts = []
+        """
+        生成主要内容
         
-        # 按页面顺序处理内容
-        for page_num in range(1, parsed_doc.get_page_count() + 1):
-            if self.config['preserve_layout']:
-                # 使用布局分析器进行精确布局还原
-                page_content = self._generate_page_with_layout(
-                    parsed_doc, page_num, image_paths
+        各页面、区域的内容片段都追加到同一个列表中，最后只拼接一次，
+        避免逐层拼接反复复制已生成的文本。
+        """
+        out: List[str] = []
+        self._write_main_content(parsed_doc, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_main_content(self, parsed_doc: ParsedDocument,
+                            image_paths: List[str], out: List[str]) -> None:
+        """
+        将主要内容片段追加到out
+        
+        out中的片段最终以空行分隔拼接。各_write_*方法对应同名的_generate_*
+        方法：直接追加各个片段，没有任何片段时追加空字符串，与逐层拼接
+        的输出保持一致。
+        """
+        page_count = parsed_doc.get_page_count()
+        
+        if self._preserve_layout:
+            # 使用布局分析器进行精确布局还原
+            write_page = self._write_page_with_layout
+        else:
+            # 使用传统的简单排序方式
+            write_page = self._write_page_simple
+        
+        workers = min(self.config['page_workers'] or 1, page_count)
+        if workers > 1:
+            # 按页并行生成，按页码顺序合并
+            page_nums = range(1, page_count + 1)
+            if self.config['page_executor'] == 'process':
+                # 文档和配置在工作进程初始化时只传输一次，按块分发页码以摊薄通信开销
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=_MP_CONTEXT,
+                    initializer=_init_page_worker,
+                    initargs=(self.config, parsed_doc, image_paths),
                 )
+                chunksize = max(1, page_count // (workers * 4))
+                render = _render_page_in_worker
             else:
-                # 使用传统的简单排序方式
-                page_content = self._generate_page_simple(
-                    parsed_doc, page_num, image_paths
-                )
+                # 线程共享生成器实例：先建立图像路径索引，页面线程只读不替换
+                self._get_image_index(image_paths)
+                
+                def render(page_num: int) -> List[str]:
+                    page_out: List[str] = []
+                    write_page(parsed_doc, page_num, image_paths, page_out)
+                    return page_out
+                
+                executor = ThreadPoolExecutor(max_workers=workers)
+                chunksize = 1
             
-            content_parts.append(page_content)
+            with executor:
+                pages = executor.map(render, page_nums, chunksize=chunksize)
+                for page_num, page_out in enumerate(pages, 1):
+                    out.extend(page_out)
+                    if page_num < page_count:
+                        out.append("#pagebreak()")
+            return
+        
+        # 按页面顺序处理内容
+        for page_num in range(1, page_count + 1):
+            write_page(parsed_doc, page_num, image_paths, out)
             
             # 只有在多页文档时才添加分页符
-            if (parsed_doc.get_page_count() > 1 and 
-                page_num < parsed_doc.get_page_count()):
-                content_parts.append("#pagebreak()")
-        
-        return '\n\n'.join(content_parts)
+            if page_count > 1 and page_num < page_count:
+                out.append("#pagebreak()")
+    
+    def _render_page(self, parsed_doc: ParsedDocument, page_num: int,
+                     image_paths: List[str]) -> List[str]:
+        """生成单个页面的内容片段（供多进程工作进程调用）"""
+        page_out: List[str] = []
+        if self._preserve_layout:
+            self._write_page_with_layout(parsed_doc, page_num, image_paths, page_out)
+        else:
+            self._write_page_simple(parsed_doc, page_num, image_paths, page_out)
+        return page_out
     
     def _generate_page_with_layout(self, parsed_doc: ParsedDocument, 
                                   page_num: int, image_paths: List[str]) -> str:
         """使用布局分析器生成页面内容"""
+        out: List[str] = []
+        self._write_page_with_layout(parsed_doc, page_num, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_page_with_layout(self, parsed_doc: ParsedDocument, page_num: int,
+                                image_paths: List[str], out: List[str]) -> None:
+        """使用布局分析器生成页面内容，片段追加到out"""
         # 分析页面布局
         page_layout = self.layout_analyzer.analyze_page_layout(parsed_doc, page_num)
         
-        content_parts = []
-        
         # 检查是否有绝对定位区域
         absolute_regions = [r for r in page_layout.regions if r.region_type == 'absolute']
         
-        if absolute_regions and self.config['use_precise_positioning']:
-            content_parts.append(self._generate_absolute_layout(page_layout, image_paths))
-        elif page_layout.column_count > 1 and self.config['detect_columns']:
-            content_parts.append(self._generate_multi_column_layout(page_layout, image_paths))
+        if absolute_regions and self._use_precise_positioning:
+            self._write_absolute_layout(page_layout, image_paths, out)
+        elif page_layout.column_count > 1 and self._detect_columns:
+            out.append(self._generate_multi_column_layout(page_layout, image_paths))
         else:
-            content_parts.append(self._generate_single_column_layout(page_layout, image_paths))
-        
-        return '\n\n'.join(content_parts)
+            self._write_single_column_layout(page_layout, image_paths, out)
     
     def _generate_page_simple(self, parsed_doc: ParsedDocument, 
                              page_num: int, image_paths: List[str]) -> str:
         """使用传统方式生成页面内容（向后兼容）"""
-        page_elements = parsed_doc.get_elements_by_page(page_num)
-        
-        # 合并所有元素并按位置排序
-        all_elements = []
-        
-        # 添加标题
-        for heading in page_elements['headings']:
-            all_elements.append(('heading', heading, heading.bbox.y0))
+        out: List[str] = []
+        self._write_page_simple(parsed_doc, page_num, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_page_simple(self, parsed_doc: ParsedDocument, page_num: int,
+                           image_paths: List[str], out: List[str]) -> None:
+        """使用传统方式生成页面内容，片段追加到out"""
+        page_elements = parsed_doc.get_elements_by_page(page_num, copy=False)
         
-        # 添加段落
-        for paragraph in page_elements['paragraphs']:
-            all_elements.append(('paragraph', paragraph, paragraph.bbox.y0))
+        # 合并所有元素并按位置排序，每个元素记为(y坐标, 生成方法, 参数)
+        entries = []
         
-        # 添加表格
-        for table in page_elements['tables']:
-            all_elements.append(('table', table, table.bbox.y0))
+        # 添加标题、段落、表格
+        for key, generate in (('headings', self._generate_heading),
+                              ('paragraphs', self._generate_paragraph),
+                              ('tables', self._generate_table)):
+            entries.extend((element.bbox.y0, generate, (element,))
+                           for element in page_elements[key])
         
         # 添加图像
-        for i, image in enumerate(page_elements['images']):
-            image_path = image_paths[i] if i < len(image_paths) else ""
-            all_elements.append(('image', (image, image_path), image.bbox.y0))
+        path_count = len(image_paths)
+        entries.extend(
+            (image.bbox.y0, self._generate_image,
+             (image, image_paths[i] if i < path_count else ""))
+            for i, image in enumerate(page_elements['images'])
+        )
         
         # 添加列表
-        for doc_list in page_elements['lists']:
-            all_elements.append(('list', doc_list, doc_list.bbox.y0))
+        entries.extend((doc_list.bbox.y0, self._generate_list, (doc_list,))
+                       for doc_list in page_elements['lists'])
         
-        # 按y坐标排序（从上到下）
-        all_elements.sort(key=lambda x: -x[2])  # 负号因为PDF坐标系
+        # 按y坐标从大到小排序（PDF坐标系，即从上到下；排序稳定，同高度保持上述顺序）
+        entries.sort(key=itemgetter(0), reverse=True)
         
         # 生成内容
-        content_parts = []
-        for element_type, element, _ in all_elements:
-            if element_type == 'heading':
-                content_parts.append(self._generate_heading(element))
-            elif element_type == 'paragraph':
-                content_parts.append(self._generate_paragraph(element))
-            elif element_type == 'table':
-                content_parts.append(self._generate_table(element))
-            elif element_type == 'image':
-                image, image_path = element
-                content_parts.append(self._generate_image(image, image_path))
-            elif element_type == 'list':
-                content_parts.append(self._generate_list(element))
+        out.extend(generate(*args) for _, generate, args in entries)
         
-        return '\n\n'.join(content_parts)
+        if not entries:
+            out.append("")
     
     def _generate_absolute_layout(self, page_layout: PageLayout, 
                                  image_paths: List[str]) -> str:
         """生成绝对定位布局"""
+        out: List[str] = []
+        self._write_absolute_layout(page_layout, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_absolute_layout(self, page_layout: PageLayout,
+                               image_paths: List[str], out: List[str]) -> None:
+        """生成绝对定位布局，片段追加到out"""
         absolute_regions = [r for r in page_layout.regions if r.region_type == 'absolute']
-        
-        if not absolute_regions:
-            return ""
-        
-        content_parts = []
+        start = len(out)
         
         # 处理每个绝对定位区域
         for region in absolute_regions:
@@ -394,18 +793,19 @@ class TypstGenerator:
             for group in layout_groups:
                 for element_type, element in group:
                     if element_type == 'heading':
-                        content_parts.append(self._generate_heading_absolute(element, page_layout))
+                        out.append(self._generate_heading_absolute(element, page_layout))
                     elif element_type == 'paragraph':
-                        content_parts.append(self._generate_paragraph_absolute(element, page_layout))
+                        out.append(self._generate_paragraph_absolute(element, page_layout))
                     elif element_type == 'table':
-                        content_parts.append(self._generate_table_absolute(element, page_layout))
+                        out.append(self._generate_table_absolute(element, page_layout))
                     elif element_type == 'image':
                         image_path = self._find_image_path(element, image_paths)
-                        content_parts.append(self._generate_image_absolute(element, image_path, page_layout))
+                        out.append(self._generate_image_absolute(element, image_path, page_layout))
                     elif element_type == 'list':
-                        content_parts.append(self._generate_list_absolute(element, page_layout))
+                        out.append(self._generate_list_absolute(element, page_layout))
         
-        return '\n\n'.join(content_parts)
+        if len(out) == start:
+            out.append("")
     
     def _analyze_element_relationships_for_layout(self, region: LayoutRegion, 
                                                  page_layout: PageLayout) -> List[List]:
@@ -427,8 +827,8 @@ class TypstGenerator:
         groups = []
         current_group = []
         
-        for i, (elem_type, element) in enumerate(elements):
-            if not hasattr(element, 'bbox') or not element.bbox:
+        for elem_type, element in elements:
+            if not getattr(element, 'bbox', None):
                 # 没有bbox信息的元素单独成组
                 if current_group:
                     groups.append(current_group)
@@ -459,17 +859,15 @@ class TypstGenerator:
         """检查新元素是否与组中元素重叠或冲突"""
         elem_type, element = new_element
         
-        if not hasattr(element, 'bbox') or not element.bbox:
+        new_bbox = getattr(element, 'bbox', None)
+        if not new_bbox:
             return False
         
-        new_bbox = element.bbox
-        
         for group_type, group_element in group:
-            if not hasattr(group_element, 'bbox') or not group_element.bbox:
+            group_bbox = getattr(group_element, 'bbox', None)
+            if not group_bbox:
                 continue
             
-            group_bbox = group_element.bbox
-            
             # 检查重叠
             if self._bboxes_overlap(new_bbox, group_bbox):
                 return True
@@ -498,8 +896,10 @@ class TypstGenerator:
         if (type1 == 'image' and type2 in ['paragraph', 'heading']) or \
            (type2 == 'image' and type1 in ['paragraph', 'heading']):
             # 图片和文字如果距离太近，认为有冲突
-            if hasattr(obj1, 'bbox') and hasattr(obj2, 'bbox'):
-                return self._elements_too_close(obj1.bbox, obj2.bbox, threshold=20)  # 20pt阈值
+            bbox1 = getattr(obj1, 'bbox', None)
+            bbox2 = getattr(obj2, 'bbox', None)
+            if bbox1 is not None and bbox2 is not None:
+                return self._elements_too_close(bbox1, bbox2, threshold=20)  # 20pt阈值
         
         return False
     
@@ -540,7 +940,7 @@ class TypstGenerator:
                 image_path = self._find_image_path(element, image_paths)
                 if image_path:
                     # 图片使用相对尺寸
-                    rel_width = min(50, max(20, float(position['width'].rstrip('%'))))
+                    rel_width = min(50, max(20, position.width_f))
                     group_content_parts.append(f'#figure(image("{image_path}", width: {rel_width}%), caption: [])')
             elif element_type == 'list':
                 group_content_parts.append(self._generate_list(element))
@@ -549,9 +949,9 @@ class TypstGenerator:
         group_content = '\n\n'.join(group_content_parts)
         
         return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[#box(width: {position['width']})[
+  dx: {position.left},
+  dy: {position.top},
+)[#box(width: {position.width})[
 {group_content}
 ]]'''
     
@@ -559,8 +959,9 @@ class TypstGenerator:
         """计算元素组的边界框"""
         bboxes = []
         for element_type, element in group:
-            if hasattr(element, 'bbox') and element.bbox:
-                bboxes.append(element.bbox)
+            bbox = getattr(element, 'bbox', None)
+            if bbox:
+                bboxes.append(bbox)
         
         if not bboxes:
             return None
@@ -605,8 +1006,9 @@ class TypstGenerator:
     
     def _get_element_y_position(self, element) -> float:
         """获取元素的Y坐标"""
-        if hasattr(element, 'bbox') and element.bbox:
-            return element.bbox.y0
+        bbox = getattr(element, 'bbox', None)
+        if bbox:
+            return bbox.y0
         return 0
     
     def _generate_multi_column_layout(self, page_layout: PageLayout, 
@@ -627,13 +1029,11 @@ class TypstGenerator:
         column_contents = []
         for region in column_regions:
             column_content = self._generate_region_content(region, page_layout, image_paths)
-            column_contents.append(column_content)
+            column_contents.append(f"#box(width: 100%)[{column_content}]")
         
         # 使用Typst的columns功能
         columns_spec = ", ".join(column_widths)
-        columns_content = "\n\n".join([
-            f"#box(width: 100%)[{content}]" for content in column_contents
-        ])
+        columns_content = "\n\n".join(column_contents)
         
         return f'''#columns({len(column_regions)}, gutter: 1em)[
 {columns_content}
@@ -642,93 +1042,129 @@ class TypstGenerator:
     def _generate_single_column_layout(self, page_layout: PageLayout, 
                                       image_paths: List[str]) -> str:
         """生成单列布局"""
-        content_parts = []
-        
-        # 按区域类型排序（页眉 -> 主体 -> 页脚）
-        region_order = {'header': 0, 'column': 1, 'main': 1, 'footer': 2}
-        sorted_regions = sorted(page_layout.regions, 
-                               key=lambda r: region_order.get(r.region_type, 1))
+        out: List[str] = []
+        self._write_single_column_layout(page_layout, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_single_column_layout(self, page_layout: PageLayout,
+                                    image_paths: List[str], out: List[str]) -> None:
+        """生成单列布局，片段追加到out"""
+        start = len(out)
+        
+        # 按区域类型分桶（页眉 -> 主体 -> 页脚），同类区域保持原有顺序
+        headers, bodies, footers = [], [], []
+        for region in page_layout.regions:
+            region_type = region.region_type
+            if region_type == 'header':
+                headers.append(region)
+            elif region_type == 'footer':
+                footers.append(region)
+            else:
+                bodies.append(region)
+        sorted_regions = headers + bodies + footers
         
         for region in sorted_regions:
-            region_content = self._generate_region_content(region, page_layout, image_paths)
-            if region_content.strip():
-                content_parts.append(region_content)
-        
-        return '\n\n'.join(content_parts)
+            region_start = len(out)
+            self._write_region_content(region, page_layout, image_paths, out)
+            # 区域内容全为空白时丢弃
+            if not any(part.strip() for part in out[region_start:]):
+                del out[region_start:]
+        
+        if len(out) == start:
+            out.append("")
     
     def _generate_region_content(self, region: LayoutRegion, page_layout: PageLayout,
                                 image_paths: List[str]) -> str:
         """生成区域内容"""
-        content_parts = []
+        out: List[str] = []
+        self._write_region_content(region, page_layout, image_paths, out)
+        return '\n\n'.join(out)
+    
+    def _write_region_content(self, region: LayoutRegion, page_layout: PageLayout,
+                              image_paths: List[str], out: List[str]) -> None:
+        """生成区域内容，片段追加到out"""
+        start = len(out)
         
         for element_type, element in region.elements:
             if element_type == 'heading':
-                content_parts.append(self._generate_heading_with_position(element, page_layout))
+                out.append(self._generate_heading_with_position(element, page_layout))
             elif element_type == 'paragraph':
-                content_parts.append(self._generate_paragraph_with_position(element, page_layout))
+                out.append(self._generate_paragraph_with_position(element, page_layout))
             elif element_type == 'table':
-                content_parts.append(self._generate_table_with_position(element, page_layout))
+                out.append(self._generate_table_with_position(element, page_layout))
             elif element_type == 'image':
                 # 找到对应的图像路径
                 image_path = self._find_image_path(element, image_paths)
-                content_parts.append(self._generate_image_with_position(element, image_path, page_layout))
+                out.append(self._generate_image_with_position(element, image_path, page_layout))
             elif element_type == 'list':
-                content_parts.append(self._generate_list_with_position(element, page_layout))
+                out.append(self._generate_list_with_position(element, page_layout))
         
-        return '\n\n'.join(content_parts)
+        if len(out) == start:
+            out.append("")
     
     def _find_image_path(self, image: Image, image_paths: List[str]) -> str:
         """查找图像对应的路径"""
-        # 简单匹配：根据文件名查找
+        # 按文件名直接查找
+        path = self._get_image_index(image_paths).get(image.filename)
+        if path is not None:
+            return path
+        
+        # 文件名不完全相同时，回退到包含匹配
         for path in image_paths:
             if image.filename in path:
                 return path
         return ""
     
+    def _get_image_index(self, image_paths: List[str]) -> Dict[str, str]:
+        """获取图像路径列表的文件名索引（重名时保留第一个路径）"""
+        cached = self._image_index
+        if cached is None or cached[0] is not image_paths:
+            index: Dict[str, str] = {}
+            for path in image_paths:
+                if path:
+                    index.setdefault(Path(path).name, path)
+            cached = self._image_index = (image_paths, index)
+        return cached[1]
+    
     def _generate_heading_absolute(self, heading: Heading, page_layout: PageLayout) -> str:
         """生成绝对定位的标题"""
         base_heading = self._generate_heading(heading)
         
-        if not hasattr(heading, 'bbox') or not heading.bbox:
+        bbox = getattr(heading, 'bbox', None)
+        if not bbox:
             return base_heading
         
         # 计算绝对位置（转换为相对单位）
-        position = self._calculate_absolute_position(heading.bbox, page_layout)
+        position = self._calculate_absolute_position(bbox, page_layout)
         
-        return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[{base_heading}]'''
+        return _PLACE_TMPL.format(left=position.left, top=position.top, body=base_heading)
     
     def _generate_paragraph_absolute(self, paragraph: Paragraph, page_layout: PageLayout) -> str:
         """生成绝对定位的段落"""
         base_paragraph = self._generate_paragraph(paragraph)
         
-        if not hasattr(paragraph, 'bbox') or not paragraph.bbox:
+        bbox = getattr(paragraph, 'bbox', None)
+        if not bbox:
             return base_paragraph
         
         # 计算绝对位置
-        position = self._calculate_absolute_position(paragraph.bbox, page_layout)
+        position = self._calculate_absolute_position(bbox, page_layout)
         
-        return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[#box(width: {position['width']})[{base_paragraph}]]'''
+        return _PLACE_BOX_TMPL.format(left=position.left, top=position.top,
+                                      width=position.width, body=base_paragraph)
     
     def _generate_table_absolute(self, table: Table, page_layout: PageLayout) -> str:
         """生成绝对定位的表格"""
         base_table = self._generate_table(table)
         
-        if not hasattr(table, 'bbox') or not table.bbox:
+        bbox = getattr(table, 'bbox', None)
+        if not bbox:
             return base_table
         
         # 计算绝对位置
-        position = self._calculate_absolute_position(table.bbox, page_layout)
+        position = self._calculate_absolute_position(bbox, page_layout)
         
-        return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[{base_table}]'''
+        return _PLACE_TMPL.format(left=position.left, top=position.top, body=base_table)
     
     def _generate_image_absolute(self, image: Image, image_path: str, 
                                 page_layout: PageLayout) -> str:
@@ -736,103 +1172,46 @@ class TypstGenerator:
         if not image_path:
             return f"// 图像文件缺失: {image.filename}"
         
-        if not hasattr(image, 'bbox') or not image.bbox:
+        bbox = getattr(image, 'bbox', None)
+        if not bbox:
             return self._generate_image(image, image_path)
         
         # 计算绝对位置和尺寸
-        position = self._calculate_absolute_position(image.bbox, page_layout)
+        position = self._calculate_absolute_position(bbox, page_layout)
         
         image_ref = f'''#figure(
-  image("{image_path}", width: {position['width']}, height: {position['height']}),
+  image("{image_path}", width: {position.width}, height: {position.height}),
   caption: []
 )'''
         
-        return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[{image_ref}]'''
+        return _PLACE_TMPL.format(left=position.left, top=position.top, body=image_ref)
     
     def _generate_list_absolute(self, doc_list: DocList, page_layout: PageLayout) -> str:
         """生成绝对定位的列表"""
         base_list = self._generate_list(doc_list)
         
-        if not hasattr(doc_list, 'bbox') or not doc_list.bbox:
+        bbox = getattr(doc_list, 'bbox', None)
+        if not bbox:
             return base_list
         
         # 计算绝对位置
-        position = self._calculate_absolute_position(doc_list.bbox, page_layout)
+        position = self._calculate_absolute_position(bbox, page_layout)
         
-        return f'''#place(
-  dx: {position['left']},
-  dy: {position['top']},
-)[#box(width: {position['width']})[{base_list}]]'''
-    
-    def _calculate_absolute_position(self, bbox: 'BoundingBox', page_layout: PageLayout) -> Dict[str, str]:
-        """计算绝对位置"""
-        # 转换PDF坐标到Typst坐标（PDF原点在左下角，Typst在左上角）
-        # 修复：使用y1（顶部）来计算top位置，这样元素顶部对应Typst的dy位置
-        top_pt = page_layout.page_height - bbox.y1  # 从页面顶部到元素顶部的距离
-        left_pt = bbox.x0
-        width_pt = bbox.width
-        height_pt = bbox.height
-        
-        # 确保坐标不会超出页面范围
-        top_pt = max(0, min(top_pt, page_layout.page_height))
-        left_pt = max(0, min(left_pt, page_layout.page_width))
-        
-        # 考虑页面边距 (10mm = 28.35pt)
-        margin_pt = 28.35
-        content_width = page_layout.page_width - 2 * margin_pt
-        content_height = page_layout.page_height - 2 * margin_pt
-        
-        # 调整坐标到内容区域
-        adjusted_left = left_pt - margin_pt
-        adjusted_top = top_pt - margin_pt
-        
-        # 转换为相对单位（相对于内容区域）
-        left_rel = max(0, adjusted_left / content_width * 100)
-        top_rel = max(0, adjusted_top / content_height * 100)
-        width_rel = width_pt / content_width * 100
-        height_rel = height_pt / content_height * 100
-        
-        # 确保元素不超出页面边界
-        if left_rel + width_rel > 100:
-            width_rel = max(10, 100 - left_rel)
-        if top_rel + height_rel > 100:
-            height_rel = max(5, 100 - top_rel)
-        
-        # 强制限制top和left在合理范围内
-        if top_rel > 95:  # 如果top超过95%，调整到合理位置
-            top_rel = 95
-        if left_rel > 90:  # 如果left超过90%，调整到合理位置
-            left_rel = 90
-        
-        # 限制最大尺寸，避免元素过大
-        width_rel = min(width_rel, 80)  # 最大80%宽度
-        height_rel = min(height_rel, 60)  # 最大60%高度
-        
-        # 确保最小尺寸
-        width_rel = max(width_rel, 10)  # 最小10%宽度
-        height_rel = max(height_rel, 5)  # 最小5%高度
-        
-        # 四舍五入
-        left_rel = round(left_rel, 2)
-        top_rel = round(top_rel, 2)
-        width_rel = round(width_rel, 2)
-        height_rel = round(height_rel, 2)
-        
-        return {
-            'top': f"{top_rel}%",
-            'left': f"{left_rel}%",
-            'width': f"{width_rel}%",
-            'height': f"{height_rel}%"
-        }
+        return _PLACE_BOX_TMPL.format(left=position.left, top=position.top,
+                                      width=position.width, body=base_list)
+    
+    def _calculate_absolute_position(self, bbox: 'BoundingBox', page_layout: PageLayout) -> _Pos:
+        """计算绝对位置（结果按边界框和页面尺寸缓存，见_format_abs_position）"""
+        return _format_abs_position(
+            bbox.x0, bbox.y0, bbox.x1, bbox.y1,
+            page_layout.page_width, page_layout.page_height
+        )
     
     def _generate_heading_with_position(self, heading: Heading, page_layout: PageLayout) -> str:
         """生成带位置信息的标题"""
         base_heading = self._generate_heading(heading)
         
-        if not self.config['use_precise_positioning']:
+        if not self._use_precise_positioning:
             return base_heading
         
         # 获取精确位置信息
@@ -842,9 +1221,10 @@ class TypstGenerator:
             return base_heading
         
         # 根据位置信息调整样式
-        if position_info.get('rel_x', 0) > 75:  # 右对齐
+        rel_x = position_info.get('rel_x', 0)
+        if rel_x > 75:  # 右对齐
             return f"#align(right)[{base_heading}]"
-        elif 25 < position_info.get('rel_x', 0) < 75:  # 居中
+        elif 25 < rel_x < 75:  # 居中
             return f"#align(center)[{base_heading}]"
         else:
             return base_heading  # 左对齐（默认）
@@ -853,7 +1233,7 @@ class TypstGenerator:
         """生成带位置信息的段落"""
         base_paragraph = self._generate_paragraph(paragraph)
         
-        if not self.config['use_precise_positioning']:
+        if not self._use_precise_positioning:
             return base_paragraph
         
         # 获取精确位置信息
@@ -866,12 +1246,12 @@ class TypstGenerator:
         adjustments = []
         
         # 检查是否需要特殊缩进
-        if position_info.get('rel_x', 0) > 10:  # 有明显缩进
-            indent_em = round(position_info.get('rel_x', 0) / 10, 1)
-            adjustments.append(f"#pad(left: {indent_em}em)")
+        rel_x = position_info.get('rel_x', 0)
+        if rel_x > 10:  # 有明显缩进
+            adjustments.append(_format_indent_pad(rel_x))
         
         # 检查是否需要特殊间距
-        if self.config['maintain_spacing']:
+        if self._maintain_spacing:
             # 这里可以根据需要添加垂直间距调整
             pass
         
@@ -884,7 +1264,7 @@ class TypstGenerator:
         """生成带位置信息的表格"""
         base_table = self._generate_table(table)
         
-        if not self.config['use_precise_positioning']:
+        if not self._use_precise_positioning:
             return base_table
         
         # 获取精确位置信息
@@ -894,9 +1274,10 @@ class TypstGenerator:
             return base_table
         
         # 根据位置调整表格对齐
-        if position_info.get('rel_x', 0) > 60:  # 右对齐
+        rel_x = position_info.get('rel_x', 0)
+        if rel_x > 60:  # 右对齐
             return f"#align(right)[{base_table}]"
-        elif 20 < position_info.get('rel_x', 0) < 80:  # 居中
+        elif 20 < rel_x < 80:  # 居中
             return f"#align(center)[{base_table}]"
         else:
             return base_table  # 左对齐（默认）
@@ -907,16 +1288,19 @@ class TypstGenerator:
         if not image_path:
             return f"// 图像文件缺失: {image.filename}"
         
-        # 获取精确位置信息
-        position_info = self.layout_analyzer.get_element_precise_position(image, page_layout)
+        # 获取精确位置信息（未启用精确定位时不需要）
+        if self._use_precise_positioning:
+            position_info = self.layout_analyzer.get_element_precise_position(image, page_layout)
+        else:
+            position_info = None
         
         # 计算图像宽度
-        if position_info and self.config['use_precise_positioning']:
+        if position_info:
             # 使用原始宽度比例
             width_percent = min(position_info.get('rel_width', 80), 100)
             width = f"{width_percent}%"
         else:
-            width = self.config['image_width']
+            width = self._image_width
         
         # 生成图像引用
         image_ref = f'''#figure(
@@ -925,7 +1309,7 @@ class TypstGenerator:
 )'''
         
         # 根据位置确定对齐方式
-        if position_info and self.config['use_precise_positioning']:
+        if position_info:
             rel_x = position_info.get('rel_x', 0)
             if rel_x > 70:  # 右对齐
                 return f"#align(right)[{image_ref}]"
@@ -935,7 +1319,7 @@ class TypstGenerator:
                 return image_ref
         else:
             # 使用默认对齐方式
-            if self.config['image_alignment'] == 'center':
+            if self._image_center:
                 return f"#align(center)[{image_ref}]"
             else:
                 return image_ref
@@ -944,7 +1328,7 @@ class TypstGenerator:
         """生成带位置信息的列表"""
         base_list = self._generate_list(doc_list)
         
-        if not self.config['use_precise_positioning']:
+        if not self._use_precise_positioning:
             return base_list
         
         # 获取精确位置信息
@@ -954,9 +1338,9 @@ class TypstGenerator:
             return base_list
         
         # 添加缩进调整
-        if position_info.get('rel_x', 0) > 10:  # 有明显缩进
-            indent_em = round(position_info.get('rel_x', 0) / 10, 1)
-            return f"#pad(left: {indent_em}em)[{base_list}]"
+        rel_x = position_info.get('rel_x', 0)
+        if rel_x > 10:  # 有明显缩进
+            return f"{_format_indent_pad(rel_x)}[{base_list}]"
         else:
             return base_list
     
@@ -992,19 +1376,14 @@ class TypstGenerator:
             return False
         
         # 3. 不包含过多小写字母连续文本（避免段落被误识别）
-        words = text.split()
-        if len(words) > 10:  # 超过10个单词的可能是段落
-            return False
+        # 空白只有不超过9个空格时最多10个单词，无需split
+        # （isprintable为真时文本中唯一的空白字符是ASCII空格）
+        if (text.count(' ') > 9 or not text.isprintable()) and len(text.split()) > 10:
+            return False  # 超过10个单词的可能是段落
         
         # 4. 检查是否包含常见的非标题内容
-        non_heading_patterns = [
-            'such as', 'for example', 'in many cases', 'occasionally',
-            'depending on', 'when', 'where', 'which', 'that'
-        ]
-        text_lower = text.lower()
-        for pattern in non_heading_patterns:
-            if pattern in text_lower:
-                return False
+        if _NON_HEADING_RE.search(text.lower()):
+            return False
         
         return True
     
@@ -1013,55 +1392,52 @@ class TypstGenerator:
         if not text:
             return text
         
+        # 不含大写字母和数字的文本（如纯小写正文）只需处理常见连接错误；
+        # 各步骤只插入空格和句号，不会产生新的大写字母或数字
+        has_trigger = _MIXED_TRIGGER_RE.search(text) is not None
+        
         # 检测常见的文本合并模式
-        # 1. 两个句子没有空格分隔（句号后直接跟大写字母）
-        import re
-        text = re.sub(r'\.([A-Z])', r'. \1', text)
-        
-        # 2. 检测可能的标题合并（全大写单词连在一起）
-        text = re.sub(r'([A-Z]{3,})([A-Z]{3,})', r'\1 \2', text)
-        
-        # 3. 处理常见的单词连接错误
-        common_fixes = [
-            ('inButterflyfishes', 'in Butterflyfishes'),
-            ('towardstheir', 'towards their'),
-            ('manyoccasions', 'many occasions'),
-            ('cleanlyother', 'cleanly other'),
-            ('specieswith', 'species with'),
-            ('suchfish', 'such fish'),
-            ('sidetheir', 'side their'),
-            ('linesoccasions', 'lines occasions'),
-            ('orWhen', 'or When'),
-            ('pelewensisandC', 'pelewensis and C'),
-            ('butorgans', 'but organs'),
-            ('speciesadult', 'species adult'),
-            ('ABERRATIONSSURVIVORS', 'ABERRATIONS SURVIVORS'),
-        ]
-        
-        for wrong, correct in common_fixes:
-            text = text.replace(wrong, correct)
+        if has_trigger:
+            # 1. 两个句子没有空格分隔（句号后直接跟大写字母）
+            text = _SENTENCE_JOIN_RE.sub(r'. \1', text)
+            
+            # 2. 检测可能的标题合并（全大写单词连在一起）
+            text = _CAPS_RUN_RE.sub(r'\1 \2', text)
+        
+        # 3. 处理常见的单词连接错误（先用合并的正则扫描一次，绝大多数文本无需替换）
+        if _COMMON_FIXES_RE.search(text):
+            for wrong, correct in _COMMON_FIXES:
+                text = text.replace(wrong, correct)
         
         # 4. 修复数字和单词连接
-        text = re.sub(r'(\d+)([A-Za-z])', r'\1 \2', text)
-        text = re.sub(r'([A-Za-z])(\d+)', r'\1 \2', text)
+        if has_trigger:
+            text = _DIGIT_ALPHA_RE.sub(r'\1 \2', text)
+            text = _ALPHA_DIGIT_RE.sub(r'\1 \2', text)
         
         return text.strip()
     
     def _generate_paragraph(self, paragraph: Paragraph) -> str:
         """生成段落"""
-        # 合并段落中的文本块
+        # 合并段落中的文本块（转义直接使用转义表，样式只读取一次）
         text_parts = []
+        append = text_parts.append
+        has_special = _TYPST_SPECIAL_RE.search
         
         for block in paragraph.text_blocks:
-            text = self._escape_typst_text(block.text)
+            text = block.text
+            if not text:
+                text = ""
+            elif has_special(text):
+                text = text.translate(_TYPST_ESCAPE_TABLE)
             
             # 应用样式
-            if block.is_bold:
+            styles = block.font.styles
+            if styles & TextStyle.BOLD:
                 text = f"*{text}*"
-            if block.is_italic:
+            if styles & TextStyle.ITALIC:
                 text = f"_{text}_"
             
-            text_parts.append(text)
+            append(text)
         
         paragraph_text = ' '.join(text_parts)
         
@@ -1081,29 +1457,22 @@ class TypstGenerator:
         if not table.cells:
             return ""
         
-        # 转换为二维数组
-        table_data = table.to_2d_array()
-        
-        # 生成表格内容
-        table_cells = []
-        
-        for row in table_data:
-            # 转义单元格内容并用方括号包围
-            for cell in row:
-                escaped_cell = self._escape_typst_text(cell)
-                table_cells.append(f"[{escaped_cell}]")
+        # 生成表格内容：按行优先直接遍历单元格，转义内容并用方括号包围
+        has_special = _TYPST_SPECIAL_RE.search
+        table_cells = [f"[{text.translate(_TYPST_ESCAPE_TABLE) if has_special(text) else text}]"
+                       for _, _, text in table.iter_cells_rowmajor()]
         
-        # 用逗号和空格连接所有单元格
-        table_content = ", ".join(table_cells) + ","
+        # 用逗号和空格连接所有单元格（末尾逗号写在模板中）
+        table_content = ", ".join(table_cells)
         
         # 生成表格定义
         col_spec = ", ".join(["auto"] * table.cols)
         
         typst_table = f'''#table(
   columns: ({col_spec}),
-  stroke: {self.config['table_stroke']},
-  fill: {self.config['table_fill']},
-  {table_content}
+  stroke: {self._table_stroke},
+  fill: {self._table_fill},
+  {table_content},
 )'''
         
         return typst_table
@@ -1115,11 +1484,11 @@ class TypstGenerator:
         
         # 生成图像引用
         image_ref = f'''#figure(
-  image("{image_path}", width: {self.config['image_width']}),
+  image("{image_path}", width: {self._image_width}),
   caption: []
 )'''
         
-        if self.config['image_alignment'] == 'center':
+        if self._image_center:
             return f"#align(center)[\n{image_ref}\n]"
         else:
             return image_ref
@@ -1130,31 +1499,29 @@ class TypstGenerator:
             return ""
         
         list_items = []
+        marker = "+" if doc_list.list_type == "ordered" else "-"
         
         for item in doc_list.items:
             # 根据级别添加缩进
-            indent = "  " * (item.level - 1)
+            depth = item.level - 1
+            indent = _LIST_INDENTS[depth] if 0 <= depth < 8 else "  " * depth
             
             # 清理列表项文本（移除原始标记）
             text = self._clean_list_item_text(item.text)
             text = self._escape_typst_text(text)
             
-            if doc_list.list_type == "ordered":
-                list_items.append(f"{indent}+ {text}")
-            else:
-                list_items.append(f"{indent}- {text}")
+            list_items.append(f"{indent}{marker} {text}")
         
         return "\n".join(list_items)
     
     def _save_images(self, images: List[Image], output_dir: Path) -> List[str]:
         """保存图像文件"""
         output_dir.mkdir(parents=True, exist_ok=True)
-        image_paths = []
         
         # 获取图像文件夹名（相对于输出目录）
         folder_name = output_dir.name
         
-        for image in images:
+        def save_one(image: Image) -> str:
             # 创建图像文件路径
             image_file = output_dir / image.filename
             
@@ -1164,72 +1531,50 @@ class TypstGenerator:
                     f.write(image.data)
                 
                 # 使用相对路径（包含文件夹名）
-                relative_path = f"{folder_name}/{image.filename}"
-                image_paths.append(relative_path)
-                
-                logger.info(f"保存图像: {image_file}")
+                return f"{folder_name}/{image.filename}"
                 
             except Exception as e:
                 logger.error(f"保存图像失败 {image.filename}: {e}")
-                image_paths.append("")
+                return ""
+        
+        # 文件写入会释放GIL，使用线程池并行写入；文件名重复时保持顺序写入，后写入者覆盖
+        workers = min(self.config['image_workers'] or 1, len(images))
+        if workers > 1 and len({image.filename for image in images}) == len(images):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                image_paths = list(executor.map(save_one, images))
+        else:
+            image_paths = [save_one(image) for image in images]
+        
+        saved = sum(1 for path in image_paths if path)
+        if saved:
+            logger.info(f"保存图像: {saved} 个到 {output_dir}")
         
         return image_paths
     
     def _escape_typst_text(self, text: str) -> str:
-        """转义Typst特殊字符"""
+        """转义Typst特殊字符（一次str.translate完成全部替换，无特殊字符时原样返回）"""
         if not text:
             return ""
-        
-        # Typst特殊字符转义
-        escape_map = {
-            '#': '\\#',
-            '@': '\\@',
-            '$': '\\$',
-            '*': '\\*',
-            '_': '\\_',
-            '`': '\\`',
-            '[': '\\[',
-            ']': '\\]',
-            '<': '\\<',
-            '>': '\\>',
-            '\\': '\\\\',
-        }
-        
-        result = text
-        for char, escaped in escape_map.items():
-            result = result.replace(char, escaped)
-        
-        return result
+        return text.translate(_TYPST_ESCAPE_TABLE) if _TYPST_SPECIAL_RE.search(text) else text
     
     def _clean_heading_text(self, text: str) -> str:
         """清理标题文本"""
         # 移除编号前缀
-        text = re.sub(r'^(\d+(?:\.\d+)*\s*)', '', text.strip())
-        text = re.sub(r'^(第[一二三四五六七八九十\d]+[章节]\s*)', '', text.strip())
+        text = _HEADING_NUMBER_RE.sub('', text.strip())
+        text = _HEADING_CHAPTER_RE.sub('', text.strip())
         
         return text.strip()
     
     def _clean_list_item_text(self, text: str) -> str:
         """清理列表项文本"""
         # 移除列表标记
-        text = re.sub(r'^\s*[•·▪▫◦‣⁃]\s*', '', text)
-        text = re.sub(r'^\s*\d+[.、]\s*', '', text)
-        text = re.sub(r'^\s*[a-zA-Z][.、)]\s*', '', text)
-        text = re.sub(r'^\s*[一二三四五六七八九十]+[.、)]\s*', '', text)
-        text = re.sub(r'^\s*[(（]\d+[)）]\s*', '', text)
+        text = _LIST_MARKER_RE.sub('', text, count=1)
         
         return text.strip()
     
     def _map_font_family(self, font_name: str) -> str:
-        """映射字体族"""
-        font_lower = font_name.lower()
-        
-        for key, mapped_font in self._font_mapping.items():
-            if key in font_lower:
-                return mapped_font
-        
-        # 如果没有匹配，返回默认字体
-        return self.config['font_family']
+        """映射字体族（同一字体名只扫描一次映射表）"""
+        return _map_font_name(font_name, self._font_mapping_items, self._font_family)
     
     def generate_table_only(self, table: Table) -> str:
         """仅生成表格（用于测试）"""
@@ -1238,3 +1583,21 @@ class TypstGenerator:
     def generate_heading_only(self, heading: Heading) -> str:
         """仅生成标题（用于测试）"""
         return self._generate_heading(heading)
+
+
+# 多进程按页生成时工作进程内的 (生成器, 文档, 图像路径)，由_init_page_worker设置
+_page_worker_state: Optional[Tuple[TypstGenerator, ParsedDocument, List[str]]] = None
+
+
+def _init_page_worker(config: Dict, parsed_doc: ParsedDocument,
+                      image_paths: List[str]) -> None:
+    """多进程工作进程初始化：按主进程的配置重建生成器，进程内不再嵌套并行"""
+    global _page_worker_state
+    generator = TypstGenerator(dict(config, page_workers=1))
+    _page_worker_state = (generator, parsed_doc, image_paths)
+
+
+def _render_page_in_worker(page_num: int) -> List[str]:
+    """在工作进程中生成单个页面的内容片段"""
+    generator, parsed_doc, image_paths = _page_worker_state
+    return generator._render_page(parsed_doc, page_num, image_paths)